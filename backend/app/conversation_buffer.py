@@ -0,0 +1,61 @@
+"""
+Conversation Buffer for Chat Context
+Rolling window of pre-formatted conversation turns bounded by message count and prompt tokens
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Sequence
+
+from .token_budget import count_tokens, truncate_to_tokens
+
+
+class ConversationBuffer:
+    """Keep the most recent turns, formatted once at insert time, within a token budget"""
+
+    def __init__(self, max_messages: int = 4, max_tokens: int = 2000, model: str = "gpt-4"):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        # Turns are counted with the tokenizer of the model they are sent to
+        self.model = model
+        self.tokens = 0
+        # (formatted line, token count), oldest first
+        self._turns = deque()
+
+    @classmethod
+    def from_messages(cls, messages: Sequence[Dict], max_messages: int = 4, max_tokens: int = 2000,
+                      model: str = "gpt-4") -> 'ConversationBuffer':
+        """Build a buffer from {'role', 'content'} dicts, formatting only the turns that fit"""
+        buffer = cls(max_messages=max_messages, max_tokens=max_tokens, model=model)
+        buffer.extend(messages[-max_messages:])
+        return buffer
+
+    def append(self, role: str, content: str):
+        line = f"{'Human' if role == 'user' else 'Assistant'}: {content}"
+        tokens = count_tokens(line, self.model)
+        if tokens > self.max_tokens:
+            # A single oversized turn is cut to the budget rather than blowing past it
+            line = truncate_to_tokens(line, self.max_tokens, self.model)
+            tokens = min(count_tokens(line, self.model), self.max_tokens)
+
+        if len(self._turns) == self.max_messages:
+            self._evict()
+        self._turns.append((line, tokens))
+        self.tokens += tokens
+
+        # Drop the oldest turns until the budget fits; the latest one always fits on its own
+        while self.tokens > self.max_tokens and len(self._turns) > 1:
+            self._evict()
+
+    def extend(self, messages: Iterable[Dict]):
+        for msg in messages:
+            self.append(msg.get('role'), msg.get('content', ''))
+
+    def _evict(self):
+        _, tokens = self._turns.popleft()
+        self.tokens -= tokens
+
+    def render(self) -> str:
+        return "\n".join(line for line, _ in self._turns)
+
+    def __len__(self) -> int:
+        return len(self._turns)
@@ -0,0 +1,88 @@
+"""
+Persistent Embedding Cache for Facility Documents
+SQLite store of document embeddings keyed on a fingerprint of the model and document text
+"""
+
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Reuse document embeddings across restarts so unchanged facilities are never re-encoded"""
+
+    def __init__(self, path: str, model_id: str):
+        self.model_id = model_id
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (fingerprint TEXT PRIMARY KEY, embedding BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def fingerprint(self, document: str) -> str:
+        """Key on the model as well as the text so a model change never serves stale vectors"""
+        return hashlib.sha256(f"{self.model_id}\n{document}".encode()).hexdigest()
+
+    def get_many(self, fingerprints: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(fingerprints), 500):
+                chunk = fingerprints[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT fingerprint, embedding FROM embeddings WHERE fingerprint IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for fingerprint, blob in rows:
+                    found[fingerprint] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, entries: Dict[str, np.ndarray]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (fingerprint, embedding) VALUES (?, ?)",
+                [(fingerprint, np.asarray(embedding, dtype=np.float32).tobytes()) for fingerprint, embedding in entries.items()]
+            )
+            self._conn.commit()
+
+
+class PostgresEmbeddingCache(EmbeddingCache):
+    """EmbeddingCache kept in PostgreSQL, so it survives redeploys that start with an empty chroma_db directory"""
+
+    def __init__(self, engine, model_id: str):
+        from sqlalchemy import text
+
+        self.model_id = model_id
+        self._engine = engine
+        self._text = text
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS core.embedding_cache (fingerprint text PRIMARY KEY, embedding bytea NOT NULL)"
+            ))
+
+    def get_many(self, fingerprints: List[str]) -> Dict[str, np.ndarray]:
+        if not fingerprints:
+            return {}
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                self._text("SELECT fingerprint, embedding FROM core.embedding_cache WHERE fingerprint = ANY(:fingerprints)"),
+                {'fingerprints': fingerprints}
+            )
+            return {fingerprint: np.frombuffer(bytes(blob), dtype=np.float32) for fingerprint, blob in rows}
+
+    def put_many(self, entries: Dict[str, np.ndarray]):
+        if not entries:
+            return
+        with self._engine.begin() as conn:
+            conn.execute(
+                self._text("INSERT INTO core.embedding_cache (fingerprint, embedding) VALUES (:fingerprint, :embedding) "
+                           "ON CONFLICT (fingerprint) DO UPDATE SET embedding = EXCLUDED.embedding"),
+                [
+                    {'fingerprint': fingerprint, 'embedding': np.asarray(embedding, dtype=np.float32).tobytes()}
+                    for fingerprint, embedding in entries.items()
+                ]
+            )
@@ -1,16 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from prometheus_client import make_asgi_app
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from sqlalchemy.orm import Session
 from .database import get_db, Facility
 from dotenv import load_dotenv
+import logging
+import orjson
+import os
+import uuid
 
 # Import semantic services from app directory
 try:
-    from .openai_semantic_chat_service import OpenAISemanticChatService as SemanticChatService
+    from .openai_semantic_chat_service import get_chat_service
     from .vector_db_service import FacilityVectorDB
+    from .conversation_buffer import ConversationBuffer
     SEMANTIC_SEARCH_AVAILABLE = True
     print("OpenAI GPT-4 semantic search and vector database available")
 except ImportError as e:
@@ -21,10 +29,15 @@ except ImportError as e:
 
 load_dotenv()
 
+# Application loggers default to INFO; set LOG_LEVEL=DEBUG for per-request diagnostics
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+log = logging.getLogger(__name__)
+
 app = FastAPI(
     title="NTU Facilities Semantic Search API",
     description="Semantic search for NTU facilities using vector database",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -36,11 +49,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus scrape endpoint (prompt-cache and response-cache counters)
+app.mount("/metrics", make_asgi_app())
+
+# Distinguishes this process's vector DB versions from those of earlier runs in ETags
+_PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
 # Global semantic chat service
 semantic_chat = None
 if SEMANTIC_SEARCH_AVAILABLE:
     try:
-        semantic_chat = SemanticChatService()
+        semantic_chat = get_chat_service()
         print("Semantic chat service initialized")
     except Exception as e:
         print(f"Failed to initialize semantic chat: {e}")
@@ -58,6 +77,11 @@ class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[ChatMessage]] = []
     max_results: int = 5
+    stream: bool = False  # Send the response as Server-Sent Events while it is generated
+
+class ChatBatchRequest(BaseModel):
+    messages: List[str]  # Independent single-turn queries, answered in order
+    max_results: int = 5
 
 class LoadFacilitiesResponse(BaseModel):
     message: str
@@ -85,7 +109,7 @@ def root():
     }
 
 @app.post("/chat")
-def semantic_chat_endpoint(request: ChatRequest):
+async def semantic_chat_endpoint(request: ChatRequest):
     """
     Main semantic search endpoint using vector database
     Pure conversational interface for facility recommendations with conversation history
@@ -104,15 +128,26 @@ def semantic_chat_endpoint(request: ChatRequest):
         )
     
     try:
-        # Convert conversation history to simple format
-        conversation_context = []
-        if request.conversation_history:
-            conversation_context = [
-                {"role": msg.role, "content": msg.content} 
-                for msg in request.conversation_history
-            ]
+        # Keep a rolling window of recent turns within the prompt token budget, formatted once here;
+        # tokenizing (and tiktoken's first-use encoding download) runs off the event loop
+        conversation_context = await run_in_threadpool(
+            ConversationBuffer.from_messages,
+            [{"role": msg.role, "content": msg.content} for msg in request.conversation_history or []],
+            model=semantic_chat.chat_model
+        )
         
-        result = semantic_chat.process_query(
+        if request.stream:
+            return StreamingResponse(
+                _sse_events(semantic_chat.astream_query(
+                    request.message,
+                    max_results=request.max_results,
+                    conversation_history=conversation_context
+                )),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        result = await semantic_chat.aprocess_query(
             request.message, 
             max_results=request.max_results,
             conversation_history=conversation_context
@@ -125,6 +160,47 @@ def semantic_chat_endpoint(request: ChatRequest):
             detail=f"Error processing semantic search: {str(e)}"
         )
 
+@app.post("/chat/batch")
+async def semantic_chat_batch_endpoint(request: ChatBatchRequest):
+    """
+    Answer several single-turn queries in one call
+    All queries share one embedding pass and one vector search; results are aligned with the input order
+    """
+    
+    if not SEMANTIC_SEARCH_AVAILABLE:
+        raise HTTPException(
+            status_code=503, 
+            detail="Semantic search service not available. Please install required dependencies."
+        )
+    
+    if not semantic_chat:
+        raise HTTPException(
+            status_code=503,
+            detail="Semantic chat service not initialized"
+        )
+    
+    try:
+        results = await semantic_chat.aprocess_queries(request.messages, max_results=request.max_results)
+        return {"results": results}
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing semantic search: {str(e)}"
+        )
+
+async def _sse_events(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Wrap response text chunks as Server-Sent Events, ending with a [DONE] event or, on failure, an error event"""
+    try:
+        async for chunk in chunks:
+            yield f"data: {orjson.dumps({'delta': chunk}).decode()}\n\n"
+    except Exception as e:
+        # The 200 status and headers are already sent, so report the failure in-band and end the stream cleanly
+        log.exception("❌ Streaming response failed")
+        yield f"event: error\ndata: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+        return
+    yield "data: [DONE]\n\n"
+
 @app.post("/load-facilities", response_model=LoadFacilitiesResponse)
 def load_facilities_to_vector_db(db: Session = Depends(get_db)):
     """
@@ -184,8 +260,8 @@ def load_facilities_to_vector_db(db: Session = Depends(get_db)):
         )
 
 @app.get("/vector-stats", response_model=VectorStatsResponse)
-def get_vector_database_stats():
-    """Get statistics about the vector database"""
+def get_vector_database_stats(response: Response, if_none_match: Optional[str] = Header(None)):
+    """Get statistics about the vector database (ETag changes whenever the vector database is written)"""
     
     if not SEMANTIC_SEARCH_AVAILABLE:
         return VectorStatsResponse(
@@ -201,6 +277,12 @@ def get_vector_database_stats():
             is_available=False
         )
     
+    # Stats only change when the vector database does, so unchanged clients skip the count/peek
+    etag = f'"{_PROCESS_TOKEN}-{semantic_chat.vector_db.version}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     try:
         stats = semantic_chat.vector_db.get_collection_stats()
         return VectorStatsResponse(
@@ -292,6 +374,8 @@ def health_check():
         "status": "healthy",
         "semantic_search_available": SEMANTIC_SEARCH_AVAILABLE,
         "semantic_chat_initialized": semantic_chat is not None,
+        "response_cache": semantic_chat.response_cache.stats() if semantic_chat else None,
+        "semantic_cache": semantic_chat.semantic_cache.stats() if semantic_chat else None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -301,6 +385,9 @@ def get_chromadb_contents():
     if not SEMANTIC_SEARCH_AVAILABLE or not semantic_chat:
         raise HTTPException(status_code=503, detail="Vector database not available")
     
+    if not hasattr(semantic_chat.vector_db, 'collection'):
+        raise HTTPException(status_code=404, detail="ChromaDB contents are only available with VECTOR_BACKEND=chroma")
+    
     try:
         vector_db = semantic_chat.vector_db
         collection = vector_db.collection
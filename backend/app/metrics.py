@@ -0,0 +1,42 @@
+"""
+Prometheus Metrics for the Semantic Chat Service
+OpenAI prompt-cache usage and in-process cache counters, served at /metrics
+"""
+
+from typing import Any, Tuple
+
+from prometheus_client import Counter, Histogram
+
+PROMPT_CACHED_TOKENS = Counter(
+    'openai_prompt_cached_tokens_total',
+    'Prompt tokens served from the OpenAI prompt prefix cache'
+)
+PROMPT_UNCACHED_TOKENS = Counter(
+    'openai_prompt_uncached_tokens_total',
+    'Prompt tokens that missed the OpenAI prompt prefix cache'
+)
+PROMPT_TOKENS = Histogram(
+    'openai_prompt_tokens',
+    'Prompt tokens per chat completion (at most max_results filtered facilities; tune OVER_FETCH_FACTOR, default 2, against this)',
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000)
+)
+CACHE_EVENTS = Counter(
+    'chat_cache_events_total',
+    'In-process cache lookups and evictions',
+    ['cache', 'event']
+)
+
+
+def record_prompt_usage(usage: Any) -> Tuple[int, int]:
+    """Record cached vs uncached prompt tokens from a completion's usage block"""
+    if usage is None:
+        return 0, 0
+
+    total = getattr(usage, 'prompt_tokens', 0) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', 0) or 0
+
+    PROMPT_TOKENS.observe(total)
+    PROMPT_CACHED_TOKENS.inc(cached)
+    PROMPT_UNCACHED_TOKENS.inc(max(total - cached, 0))
+    return cached, total
@@ -3,12 +3,240 @@ OpenAI GPT-4 Powered Semantic Chat Service for NTU Facilities
 Replaces Ollama with OpenAI GPT-4 for better response quality
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
 import json
+import logging
+import math
 import os
-from openai import OpenAI
+import re
+import threading
+import numpy as np
+from cachetools import LRUCache
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
-from .vector_db_service import FacilityVectorDB
+from .vector_db_service import initialize_vector_db, build_facility_where, format_features, DAY_BITS, encode_days_mask
+from .conversation_buffer import ConversationBuffer
+from .response_cache import ResponseCache, SemanticResponseCache
+from .metrics import record_prompt_usage
+from .request_batcher import RequestBatcher
+from .token_budget import TokenBucketRateLimiter, count_tokens
+
+log = logging.getLogger(__name__)
+
+_WHITESPACE_RUN = re.compile(r'[ \t]+')
+_LINE_EDGE_SPACE = re.compile(r' *\n *')
+
+
+def _canonicalize(text: str) -> str:
+    """Normalize whitespace so equivalent prompts are byte-identical (cache keys and OpenAI prefix cache)"""
+    text = _WHITESPACE_RUN.sub(' ', text.replace('\r\n', '\n'))
+    return _LINE_EDGE_SPACE.sub('\n', text).strip()
+
+# Static instructions come first so the prompt prefix is byte-identical across
+# requests (eligible for OpenAI prompt caching); per-request context is appended.
+_SYSTEM_INSTRUCTIONS = """You are an intelligent NTU Singapore campus assistant with access to comprehensive knowledge from multiple domains. Provide seamless, unified recommendations by combining database results with your general knowledge about NTU and nutrition science. Avoid claiming specific outlet names or canteen numbers unless they appear in the provided facility list.
+
+COMPREHENSIVE INTELLIGENCE APPROACH:
+• Database results + NTU campus knowledge + General domain expertise
+• Apply your knowledge of nutrition, food science, study habits, facilities management
+• Use your understanding of what makes food healthy/unhealthy, good study environments, etc.
+• Give ONE coherent response - don't separate sources or mention where information came from
+• Prioritize QUALITY, HEALTH, and RELEVANCE over just using available data
+ENHANCED ANALYSIS WITH GENERAL KNOWLEDGE:
+1. **Food Classification & Prioritization Intelligence**:
+- FOOD vs BEVERAGE: When user asks for "food" or "eat", prioritize actual FOOD establishments over beverage shops
+- FOOD places: Restaurants, cafeterias, food courts, stalls serving meals (pasta, rice, noodles, soup, etc.)
+- BEVERAGE places: Bubble tea shops, coffee shops, juice bars
+- If user asks "where can I eat", focus on places that serve substantial meals, not just drinks
+- Apply your knowledge of healthy vs. unhealthy food types
+- Understand that "healthy food" means: salads, grilled items, soups, lean proteins, vegetables, fruits
+- Consider nutritional value, preparation methods, and ingredients
+- Use your knowledge of dietary restrictions (halal, vegetarian, gluten-free)
+
+2. **NTU Campus Knowledge Integration (safe usage)**:
+- North Spine and South Spine are key hubs with multiple amenities and eateries
+- Prefer options in North/South Spine when making meal recommendations if suitable
+- Use general campus knowledge (e.g., main spines often have food courts/restaurants),
+but do NOT invent or assert specific outlet names or canteen numbers unless they are in the provided list
+- Consider practical factors: walking distance, meal prices, student preferences
+- Apply your knowledge of optimal study conditions: quiet, good lighting, minimal distractions
+
+3. **Facility Quality Assessment**:
+- Use your knowledge of what makes facilities high-quality
+- Understand cleanliness standards, accessibility, comfort factors
+- Apply knowledge of peak hours, crowd management, facility maintenance
+
+4. **Day-Based Intelligence**:
+- Only suggest facilities that are actually open on the specified day
+- Completely ignore closed facilities - don't mention them at all
+- Show only operating hours relevant to the queried day
+
+RESPONSE REQUIREMENTS:
+• Give seamless, integrated recommendations using all your knowledge domains
+• Don't say "from database" or "from my knowledge" - just give the best expert advice
+• Only name facilities that are in the AVAILABLE FACILITIES list; if using general knowledge, speak in categories (e.g., "food court options", "study pods")
+• Apply your general knowledge to critically evaluate database suggestions
+• Lead with the most appropriate recommendations based on quality and suitability
+• Show only relevant operating hours for the queried day
+• Completely ignore inappropriate or closed facilities
+• For food queries: Prioritize actual FOOD places over beverage shops
+• Sound natural and conversational like a knowledgeable friend helping out
+• **If a facility includes a `map_url` (navigation link), include it in your response as a clickable link at the end of that facility’s description (e.g., “📍 [View on map](https://maps.ntu.edu.sg/...)”).**
+• Do not fabricate links; only include them when the `map_url` field is provided."""
+_REQUEST_CONTEXT_TEMPLATE = (
+    "Context: Facilities (result from semantic search): {facilities_context} and previous conversation context: {conversation_context}\n\n"
+    "Today's Context: {query_day} - only show information relevant to this day."
+)
+_SYSTEM_INSTRUCTIONS_HASH = hashlib.sha256((_SYSTEM_INSTRUCTIONS + _REQUEST_CONTEXT_TEMPLATE).encode()).hexdigest()
+
+
+# Map day variations to standard format
+_DAY_ALIASES = {
+    'monday': 'Monday', 'mon': 'Monday',
+    'tuesday': 'Tuesday', 'tue': 'Tuesday', 'tues': 'Tuesday',
+    'wednesday': 'Wednesday', 'wed': 'Wednesday',
+    'thursday': 'Thursday', 'thu': 'Thursday', 'thur': 'Thursday', 'thurs': 'Thursday',
+    'friday': 'Friday', 'fri': 'Friday',
+    'saturday': 'Saturday', 'sat': 'Saturday',
+    'sunday': 'Sunday', 'sun': 'Sunday',
+    'weekend': 'Weekend', 'weekends': 'Weekend',
+    'weekday': 'Weekday', 'weekdays': 'Weekday'
+}
+# One pass over the query; longest aliases first and whole words (plurals allowed). Intentionally stricter than
+# a substring check, which read "friend" as Friday, "wedding" as Wednesday and "sunny" as Sunday
+_DAY_PATTERN = re.compile(r'\b(' + '|'.join(sorted(_DAY_ALIASES, key=len, reverse=True)) + r')s?\b')
+
+# Days a query day is satisfied by; Weekend/Weekday match a facility open on any of their days
+_QUERY_DAY_MASKS = {
+    **DAY_BITS,
+    'Weekend': DAY_BITS['Saturday'] | DAY_BITS['Sunday'],
+    'Weekday': sum(DAY_BITS[day] for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')),
+}
+
+
+def _is_open_on(facility: Dict[str, Any], query_day: str) -> bool:
+    """Whether a facility's open days cover a specific day, or any day of a Weekend/Weekday query"""
+    days_mask = facility.get('days_mask')
+    if days_mask is None:
+        days_mask = encode_days_mask(facility.get('open_days'))
+    return bool(days_mask & _QUERY_DAY_MASKS.get(query_day, 0))
+
+
+def _format_schedule(open_time: Any, close_time: Any, open_days: Optional[List[str]]) -> str:
+    """Render a facility's schedule fields"""
+    return "Open Time: %s | Close Time: %s | Open Days: %s" % (
+        open_time, close_time, ', '.join(open_days) if open_days else 'N/A'
+    )
+
+
+def _keyword_pattern(*keywords: str, whole_word: bool = True) -> 're.Pattern[str]':
+    """
+    Compile keywords into one case-insensitive alternation anchored at word starts.
+    whole_word also anchors the end (allowing common inflections), so "tea" matches "teas" but not "Team";
+    otherwise any word starting with a keyword matches ("quietly", "lunchtime").
+    """
+    alternation = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    suffix = r'(?:s|es|ing|ed)?\b' if whole_word else ''
+    return re.compile(rf'\b(?:{alternation}){suffix}', re.IGNORECASE)
+
+
+# Query intent classifiers match word prefixes, as the original substring checks did for these words;
+# compounds that don't start with a keyword are listed explicitly ("homework"). Unlike a substring check,
+# "seating" no longer reads as "eat" and "network" no longer reads as "work".
+_STUDY_QUERY_RE = _keyword_pattern('study', 'studies', 'quiet', 'library', 'work', 'homework', 'coursework', whole_word=False)
+_FOOD_QUERY_RE = _keyword_pattern('eat', 'food', 'hungry', 'meal', 'lunch', 'dinner', 'breakfast', whole_word=False)
+_HEALTHY_QUERY_RE = _keyword_pattern('healthy', 'clean', 'light', whole_word=False)
+# Facility-name classifiers match whole words, so brand and place names don't collide ("Team" is not "tea")
+_BEVERAGE_RE = _keyword_pattern(
+    'tea', 'milk tea', 'bubble', 'boba', 'coffee', 'espresso', 'latte', 'brew', 'juice', 'smoothie',
+    'each a cup', 'chicha', 'starbucks', 'coffee bean', 'gong cha', 'koi'
+)
+_FOOD_RE = _keyword_pattern(
+    'food', 'restaurant', 'canteen', 'kitchen', 'cuisine', 'express', 'stall', 'noodle', 'rice',
+    'pasta', 'soup', 'union', 'grill', 'bbq', 'hawker', 'meals', 'dining', 'bistro', 'eatery'
+)
+_HEALTHY_RE = _keyword_pattern(
+    'soup', 'salad', 'grill', 'grilled', 'steam', 'steamed', 'bowl', 'grain', 'lean', 'yong tau foo',
+    'subway', 'poke', 'japanese', 'mediterranean'
+)
+_UNHEALTHY_RE = _keyword_pattern('fried', 'bbq', 'burger', 'bakery', 'dessert', 'cake', 'cream')
+
+
+def _healthy_score(name: str) -> int:
+    """Higher score = healthier"""
+    return bool(_HEALTHY_RE.search(name)) - bool(_UNHEALTHY_RE.search(name))
+
+
+def _spine_boost(building_l: str) -> int:
+    return 1 if ('north spine' in building_l or 'south spine' in building_l) else 0
+
+
+def _rank_food_candidates(distance: np.ndarray, spine: np.ndarray, healthy: np.ndarray, is_healthy_query: bool) -> np.ndarray:
+    """Order candidates by distance with spine (and, for healthy queries, healthiness) boosts; lower is better"""
+    score = distance - 0.2 * spine
+    if is_healthy_query:
+        score -= 0.2 * healthy
+    # Stable so equal scores keep their semantic search order
+    return np.argsort(score, kind='stable')
+
+
+# (label, key, default) for each facility field listed in the prompt, in order
+_FACILITY_FIELDS = (
+    ('Name', 'name', 'Unknown'),
+    ('Type', 'type', 'Unknown'),
+    ('Building', 'building', 'Unknown'),
+    ('Unit Number', 'unit_number', 'Unknown'),
+)
+_ATTR_FIELDS = (
+    ('Aircon', 'airconditioned', 'Unknown'),
+    ('Monitor Available', 'monitor', 'No'),
+    ('Quiet Policy', 'quiet_policy', 'N/A'),
+    ('Power Outlets', 'power_outlets', 'N/A'),
+    ('Cuisine', 'cuisine', 'N/A'),
+    ('Dine-In Available', 'dine_in', 'N/A'),
+    ('Takeaway Available', 'takeaway_friendly', 'N/A'),
+    ('Dish Style', 'dish_style', 'N/A'),
+    ('Dietary Label', 'dietary_label', 'N/A'),
+    ('Serve Breakfast', 'serves_breakfast', 'N/A'),
+    ('Healthy Option Available', 'healthy_options_available', 'N/A'),
+)
+
+
+def _format_facility_details(facility: Dict[str, Any]) -> str:
+    """Render one facility as a single ' | '-separated prompt line"""
+    details = [f"{label}: {facility.get(key, default)}" for label, key, default in _FACILITY_FIELDS]
+    details.append(_format_schedule(facility.get('open_time', 'N/A'), facility.get('close_time', 'N/A'), facility.get('open_days')))
+    details.append(f"map_url: {facility.get('map_url', 'Not Found')}")
+
+    attrs = facility.get('attrs')
+    if attrs:
+        details.extend(f"{label}: {attrs.get(key, default)}" for label, key, default in _ATTR_FIELDS)
+        # Booking only counts as required when there is a link to book through
+        details.append(f"Booking Required: {attrs.get('booking_required', 'Unknown') if attrs.get('booking_link') else 'No'}")
+
+    return " | ".join(details)
+
+
+def _format_facility_snippet(facility: Dict[str, Any]) -> str:
+    """Render the one-line summary of a facility used by the fallback response"""
+    snippet = f"the best match I found is {facility.get('name', 'Unknown')} in {facility.get('building', 'Unknown')}."
+
+    # features_str is precomputed at ingest, so no attrs scan is needed here
+    features = facility.get('features_str')
+    if features:
+        snippet += f" It offers: {features}."
+
+    open_days = facility.get('open_days')
+    if open_days and facility.get('open_time') and facility.get('close_time'):
+        snippet += f" Open {', '.join(open_days)} from {facility['open_time']} to {facility['close_time']}."
+
+    return snippet
+
 
 class OpenAISemanticChatService:
     def __init__(self):
@@ -16,7 +244,7 @@ class OpenAISemanticChatService:
         # Load environment variables
         load_dotenv()
         
-        self.vector_db = FacilityVectorDB()
+        self.vector_db = initialize_vector_db()
         
         # Initialize OpenAI client
         # Make sure to set your OPENAI_API_KEY environment variable
@@ -28,33 +256,251 @@ class OpenAISemanticChatService:
             )
         
         self.openai_client = OpenAI(api_key=api_key)
-        print("🤖 OpenAI GPT-4 client initialized")
+        self.async_openai_client = AsyncOpenAI(api_key=api_key)
+        self.chat_model = os.getenv('OPENAI_CHAT_MODEL', 'gpt-4o-mini')
+        log.info("🤖 OpenAI client initialized (model: %s)", self.chat_model)
+
+        # Keep async requests under the account's tokens/requests-per-minute quota
+        self.rate_limiter = TokenBucketRateLimiter(
+            tpm_limit=int(os.getenv('OPENAI_TPM_LIMIT', '200000')),
+            rpm_limit=int(os.getenv('OPENAI_RPM_LIMIT', '1200'))
+        )
+
+        # Candidates are filtered for relevance and day availability before the top max_results
+        # go into the prompt, so fetch extra to leave enough after filtering
+        self.over_fetch_factor = int(os.getenv('OVER_FETCH_FACTOR', '2'))
+
+        # Bounded pool for blocking embedding/search work made from async request handlers
+        self._pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('RETRIEVAL_MAX_WORKERS', '8')),
+            thread_name_prefix="retrieval"
+        )
+
+        # Concurrent queries arriving within a short window share one embedding pass and one search
+        self._retrieval_batcher = RequestBatcher(
+            self._aretrieve_batch,
+            max_batch_size=int(os.getenv('RETRIEVAL_BATCH_SIZE', '8')),
+            max_wait=float(os.getenv('RETRIEVAL_BATCH_WAIT_MS', '30')) / 1000
+        )
+
+        # (normalized query, n_results, vector DB version) -> (embedding, facilities)
+        self._retrieval_cache = LRUCache(maxsize=int(os.getenv('RETRIEVAL_CACHE_MAXSIZE', '1024')))
+        self._retrieval_cache_lock = threading.Lock()
+
+        # Bounded cache of generated responses (TTL expiry + LRU eviction)
+        self.response_cache = ResponseCache(
+            maxsize=int(os.getenv('RESPONSE_CACHE_MAXSIZE', '10000')),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+        )
+
+        # Paraphrased repeats of earlier single-turn queries skip search and OpenAI entirely
+        self.semantic_cache = SemanticResponseCache(
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.97')),
+            maxsize=int(os.getenv('SEMANTIC_CACHE_MAXSIZE', '5000')),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+        )
+
+        # Facilities seen at load/search time, and their rendered fallback snippets
+        self._facility_by_id: Dict[int, Dict[str, Any]] = {}
+        self._top_facility_snippet = functools.cache(self._render_top_facility_snippet)
         
-    def process_query(self, user_query: str, max_results: int = 5, conversation_history: List[Dict] = None) -> Dict[str, Any]:
+    def process_query(self, user_query: str, max_results: int = 5, conversation_history: Optional[ConversationBuffer] = None) -> Dict[str, Any]:
         """Process user query using semantic search + OpenAI GPT-4 with conversation context"""
         
-        print(f"💬 Processing query with OpenAI GPT-4: '{user_query}'")
+        log.debug("💬 Processing query with OpenAI GPT-4: '%s'", user_query)
         if conversation_history:
-            print(f"📝 Conversation history: {len(conversation_history)} previous messages")
+            log.debug("📝 Conversation history: %d previous messages", len(conversation_history))
         
         # Step 1: Extract day information from enhanced query
         query_day = self._extract_day_from_query(user_query)
-        
-        # Step 2: Semantic search in vector database using enhanced query
-        semantic_results = self.vector_db.semantic_search(
-            query=user_query, 
-            n_results=max_results * 3  # Get more candidates for better filtering
-        )
 
-        print(f"🔍 Retrieved {semantic_results} initial semantic search results")
+        # Step 2: Answer single-turn paraphrases from the semantic cache, otherwise
+        # run semantic search in the vector database
+        fingerprint = None if conversation_history else self._semantic_cache_fingerprint(query_day, max_results)
+        query_embedding, cached, semantic_results = self._retrieve_batch(
+            [self._retrieval_item(user_query, query_day, max_results, fingerprint)]
+        )[0]
+        if cached is not None:
+            log.debug("♻️  Semantic cache hit")
+            return self._build_query_result(user_query, cached, query_day, conversation_history)
+
+        log.debug("🔍 Retrieved %d initial semantic search results", len(semantic_results))
 
-        # Step 3: Generate conversational response using OpenAI GPT-4 with conversation context
+        # Step 3: Keep the most relevant facilities that are open on the query day
+        semantic_results = self._filter_relevant_results(semantic_results, user_query, query_day)[:max_results]
+
+        # Step 4: Generate conversational response using OpenAI GPT-4 with conversation context
         try:
             response = self._generate_openai_response_with_context(user_query, semantic_results, query_day, conversation_history) 
         except Exception as e:
-            print(f"⚠️  Error generating OpenAI response: {e}")
+            log.warning("⚠️  Error generating OpenAI response: %s", e)
+            response = self._generate_fallback_response_with_context(user_query, semantic_results, conversation_history)
+        else:
+            if fingerprint is not None:
+                self.semantic_cache.store(query_embedding, fingerprint, response)
+
+        return self._build_query_result(user_query, response, query_day, conversation_history)
+
+    async def aprocess_query(self, user_query: str, max_results: int = 5, conversation_history: Optional[ConversationBuffer] = None) -> Dict[str, Any]:
+        """Async variant of process_query for the API; concurrent queries share batched retrieval"""
+        log.debug("💬 Processing query with OpenAI GPT-4: '%s'", user_query)
+
+        query_day = self._extract_day_from_query(user_query)
+
+        fingerprint = None if conversation_history else self._semantic_cache_fingerprint(query_day, max_results)
+        retrieved = await self._retrieval_batcher.submit(
+            self._retrieval_item(user_query, query_day, max_results, fingerprint)
+        )
+        return await self._acomplete_query(user_query, query_day, fingerprint, retrieved, max_results, conversation_history)
+
+    async def aprocess_queries(self, user_queries: List[str], max_results: int = 5) -> List[Dict[str, Any]]:
+        """Answer several independent single-turn queries: one retrieval pass for all, then concurrent completions"""
+        # Repeated queries are retrieved and completed once, then fanned back out in input order
+        unique_queries = list(dict.fromkeys(user_queries))
+        query_days = [self._extract_day_from_query(user_query) for user_query in unique_queries]
+        fingerprints = [self._semantic_cache_fingerprint(query_day, max_results) for query_day in query_days]
+
+        batch = await self._aretrieve_batch([
+            self._retrieval_item(user_query, query_day, max_results, fingerprint)
+            for user_query, query_day, fingerprint in zip(unique_queries, query_days, fingerprints)
+        ])
+        results = await asyncio.gather(*[
+            self._acomplete_query(user_query, query_day, fingerprint, retrieved, max_results, None)
+            for user_query, query_day, fingerprint, retrieved in zip(unique_queries, query_days, fingerprints, batch)
+        ])
+        result_by_query = dict(zip(unique_queries, results))
+        return [dict(result_by_query[user_query]) for user_query in user_queries]
+
+    async def _acomplete_query(self, user_query: str, query_day: Optional[str], fingerprint: Optional[str],
+                               retrieved: Tuple[np.ndarray, Optional[str], List[Dict]], max_results: int,
+                               conversation_history: Optional[ConversationBuffer]) -> Dict[str, Any]:
+        """Turn a retrieval outcome into a query result, calling GPT-4 unless the semantic cache answered"""
+        query_embedding, cached, semantic_results = retrieved
+        if cached is not None:
+            log.debug("♻️  Semantic cache hit")
+            return self._build_query_result(user_query, cached, query_day, conversation_history)
+
+        log.debug("🔍 Retrieved %d initial semantic search results", len(semantic_results))
+        semantic_results = self._filter_relevant_results(semantic_results, user_query, query_day)[:max_results]
+
+        system_prompt = self._build_system_prompt(semantic_results, query_day, conversation_history)
+        try:
+            response = await self._acall_openai_gpt4(system_prompt, user_query)
+        except Exception:
+            log.exception("❌ OpenAI API call failed")
             response = self._generate_fallback_response_with_context(user_query, semantic_results, conversation_history)
+        else:
+            if fingerprint is not None:
+                self.semantic_cache.store(query_embedding, fingerprint, response)
+
+        return self._build_query_result(user_query, response, query_day, conversation_history)
+
+    async def astream_query(self, user_query: str, max_results: int = 5, conversation_history: Optional[ConversationBuffer] = None) -> AsyncIterator[str]:
+        """Streaming variant of aprocess_query that yields response text as GPT-4 generates it"""
+        log.debug("💬 Streaming query with OpenAI GPT-4: '%s'", user_query)
 
+        query_day = self._extract_day_from_query(user_query)
+
+        fingerprint = None if conversation_history else self._semantic_cache_fingerprint(query_day, max_results)
+        query_embedding, cached, semantic_results = await self._retrieval_batcher.submit(
+            self._retrieval_item(user_query, query_day, max_results, fingerprint)
+        )
+        if cached is not None:
+            log.debug("♻️  Semantic cache hit")
+            yield cached
+            return
+
+        semantic_results = self._filter_relevant_results(semantic_results, user_query, query_day)[:max_results]
+        system_prompt = self._build_system_prompt(semantic_results, query_day, conversation_history)
+        parts = []
+        try:
+            async for delta in self._astream_openai_gpt4(system_prompt, user_query):
+                parts.append(delta)
+                yield delta
+        except Exception:
+            # Tokens already sent cannot be retracted; fall back only if nothing went out,
+            # otherwise let the caller report the failure to the client
+            if parts:
+                raise
+            log.exception("❌ OpenAI streaming call failed")
+            yield self._generate_fallback_response_with_context(user_query, semantic_results, conversation_history)
+            return
+
+        if fingerprint is not None:
+            self.semantic_cache.store(query_embedding, fingerprint, "".join(parts).strip())
+
+    def _retrieval_item(self, user_query: str, query_day: Optional[str], max_results: int, fingerprint: Optional[str]) -> Tuple[str, int, Optional[str], int]:
+        """Retrieval request for a query; a query day restricts the search to facilities open on it"""
+        return (user_query, max_results * self.over_fetch_factor, fingerprint, _QUERY_DAY_MASKS.get(query_day, 0))
+
+    def _retrieve_batch(self, items: List[Tuple[str, int, Optional[str], int]]) -> List[Tuple[np.ndarray, Optional[str], List[Dict]]]:
+        """
+        Embed a batch of queries in one forward pass, answer retrieval and semantic cache hits,
+        and search the remaining queries with one vector database call per open-day filter
+
+        Args:
+            items: (query, n_results, semantic cache fingerprint or None, open-day mask or 0) per query
+
+        Returns:
+            (query embedding, cached response or None, facilities) per query
+        """
+        # Repeated queries reuse their embedding and search results until the vector DB changes
+        version = self.vector_db.version
+        keys = [(_canonicalize(query).lower(), n_results, days_mask, version) for query, n_results, _, days_mask in items]
+        with self._retrieval_cache_lock:
+            hits = [self._retrieval_cache.get(key) for key in keys]
+
+        embeddings = [hit[0] if hit else None for hit in hits]
+        pending = [i for i, hit in enumerate(hits) if hit is None]
+        if pending:
+            for i, embedding in zip(pending, self.vector_db.embed_queries([items[i][0] for i in pending])):
+                embeddings[i] = embedding
+
+        outcomes = [None] * len(items)
+        misses = []
+        for i, (_, _, fingerprint, _) in enumerate(items):
+            cached = self.semantic_cache.lookup(embeddings[i], fingerprint) if fingerprint else None
+            if cached is not None:
+                outcomes[i] = (embeddings[i], cached, [])
+            elif hits[i] is not None:
+                outcomes[i] = (embeddings[i], None, [dict(facility) for facility in hits[i][1]])
+            else:
+                misses.append(i)
+
+        # Queries sharing an open-day filter are searched together
+        misses_by_days = defaultdict(list)
+        for i in misses:
+            misses_by_days[items[i][3]].append(i)
+
+        for days_mask, group in misses_by_days.items():
+            results = self.vector_db.semantic_search_batch(
+                [items[i][0] for i in group],
+                n_results=max(items[i][1] for i in group),
+                query_embeddings=np.stack([embeddings[i] for i in group]),
+                where=build_facility_where(open_days_mask=days_mask)
+            )
+            with self._retrieval_cache_lock:
+                for i, facilities in zip(group, results):
+                    facilities = tuple(facilities[:items[i][1]])
+                    self._retrieval_cache[keys[i]] = (embeddings[i], facilities)
+                    outcomes[i] = (embeddings[i], None, [dict(facility) for facility in facilities])
+
+        return outcomes
+
+    async def _aretrieve_batch(self, items: List[Tuple[str, int, Optional[str], int]]) -> List[Tuple[np.ndarray, Optional[str], List[Dict]]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._retrieve_batch, items)
+
+    def _semantic_cache_fingerprint(self, query_day: Optional[str], max_results: int) -> str:
+        """Everything besides the query that shapes a response; a prompt or model change misses the cache"""
+        return ResponseCache.make_key(
+            model=self.chat_model,
+            instructions=_SYSTEM_INSTRUCTIONS_HASH,
+            query_day=query_day,
+            max_results=max_results
+        )
+
+    def _build_query_result(self, user_query: str, response: str, query_day: Optional[str], conversation_history: Optional[ConversationBuffer] = None) -> Dict[str, Any]:
         return {
             'response': response,
             'query_processed': user_query,
@@ -66,35 +512,20 @@ class OpenAISemanticChatService:
     
     def _extract_day_from_query(self, query: str) -> str:
         """Extract day information from user query"""
-        query_lower = query.lower()
-        
-        # Map day variations to standard format
-        day_mapping = {
-            'monday': 'Monday', 'mon': 'Monday',
-            'tuesday': 'Tuesday', 'tue': 'Tuesday', 'tues': 'Tuesday',
-            'wednesday': 'Wednesday', 'wed': 'Wednesday',
-            'thursday': 'Thursday', 'thu': 'Thursday', 'thur': 'Thursday', 'thurs': 'Thursday',
-            'friday': 'Friday', 'fri': 'Friday',
-            'saturday': 'Saturday', 'sat': 'Saturday',
-            'sunday': 'Sunday', 'sun': 'Sunday',
-            'weekend': 'Weekend', 'weekends': 'Weekend',
-            'weekday': 'Weekday', 'weekdays': 'Weekday'
-        }
-        
-        # Check for day mentions in query
-        for day_variant, standard_day in day_mapping.items():
-            if day_variant in query_lower:
-                print(f"🗓️  Detected day: {standard_day} from query")
-                return standard_day
+        match = _DAY_PATTERN.search(query.lower())
+        if match:
+            standard_day = _DAY_ALIASES[match.group(1)]
+            log.debug("🗓️  Detected day: %s from query", standard_day)
+            return standard_day
         
         return None
     
-    # def _filter_relevant_results(self, results: List[Dict], query: str, query_day: str = None) -> List[Dict]:
+    def _filter_relevant_results(self, results: List[Dict], query: str, query_day: str = None) -> List[Dict]:
         """Apply intelligent relevance filtering based on distance, query analysis, and day availability"""
         
         # For debugging: show all distances
         for r in results[:5]:
-            print(f"Debug: {r.get('name', 'Unknown')} ({r.get('type', 'unknown')}) - Distance: {r.get('distance', 0):.3f}")
+            log.debug("Debug: %s (%s) - Distance: %.3f", r.get('name', 'Unknown'), r.get('type', 'unknown'), r.get('distance', 0))
         
         # Step 1: Remove duplicates based on facility name and type
         unique_facilities = self._remove_duplicate_facilities(results, query_day)
@@ -103,139 +534,101 @@ class OpenAISemanticChatService:
         query_lower = query.lower()
         
         # Dynamic distance threshold based on query type
-        if any(word in query_lower for word in ['study', 'quiet', 'library', 'work']):
+        is_food_query = False
+        if _STUDY_QUERY_RE.search(query_lower):
             # For study queries, be more selective
             max_distance = 1.4
             # Prefer study areas and libraries
             study_types = ['study_area', 'study area', 'library']
             relevant = []
             for r in unique_facilities:
-                if r.get('distance', float('inf')) <= max_distance:
+                if r.get('distance', math.inf) <= max_distance:
                     facility_type = r.get('type', '').replace('_', ' ').lower()
                     # Boost study-related facilities
                     if any(st in facility_type for st in study_types):
                         relevant.append(r)
-                    elif r.get('distance', float('inf')) <= 1.2:  # Only very close matches for non-study facilities
+                    elif r.get('distance', math.inf) <= 1.2:  # Only very close matches for non-study facilities
                         relevant.append(r)
-        elif any(word in query_lower for word in ['eat', 'food', 'hungry', 'meal', 'lunch', 'dinner', 'breakfast']):
+        elif _FOOD_QUERY_RE.search(query_lower):
+            is_food_query = True
             # For food queries, prioritize actual food establishments over beverages,
             # incorporate healthy-food awareness and North/South Spine preference.
             max_distance = 1.6
 
-            def is_beverage_place(name: str, ftype: str) -> bool:
-                name_l = (name or '').lower()
-                ftype_l = (ftype or '').lower()
-                beverage_keywords = [
-                    'tea', 'milk tea', 'bubble', 'boba', 'coffee', 'espresso', 'latte', 'brew', 'juice', 'smoothie',
-                    'each a cup', 'chicha', 'starbucks', 'coffee bean', 'gong cha', 'koi'
-                ]
-                return ftype_l == 'beverage' or any(k in name_l for k in beverage_keywords)
-
-            def is_food_place(name: str, ftype: str) -> bool:
-                if is_beverage_place(name, ftype):
-                    return False
-                ftype_l = (ftype or '').lower()
-                name_l = (name or '').lower()
-                food_keywords = [
-                    'food', 'restaurant', 'canteen', 'kitchen', 'cuisine', 'express', 'stall', 'noodle', 'rice',
-                    'pasta', 'soup', 'union', 'grill', 'bbq', 'hawker', 'meals', 'dining', 'bistro', 'eatery'
-                ]
-                return ftype_l == 'food' or any(k in name_l for k in food_keywords)
-
-            def healthy_score(name: str) -> int:
-                # Higher score = healthier
-                nl = (name or '').lower()
-                healthy_hits = [
-                    'soup', 'salad', 'grill', 'grilled', 'steam', 'steamed', 'bowl', 'grain', 'lean', 'yong tau foo',
-                    'subway', 'poke', 'japanese', 'mediterranean'
-                ]
-                unhealthy_hits = ['fried', 'bbq', 'burger', 'bakery', 'dessert', 'cake', 'cream']
-                score = 0
-                if any(k in nl for k in healthy_hits):
-                    score += 1
-                if any(k in nl for k in unhealthy_hits):
-                    score -= 1
-                return score
-
-            def spine_boost(building: str) -> int:
-                bl = (building or '').lower()
-                return 1 if ('north spine' in bl or 'south spine' in bl) else 0
-
-            # Filter by distance first
-            candidates = [r for r in unique_facilities if r.get('distance', float('inf')) <= max_distance]
-
-            # Keep only food places primarily
-            food_candidates = [r for r in candidates if is_food_place(r.get('name'), r.get('type'))]
-            beverage_candidates = [r for r in candidates if is_beverage_place(r.get('name'), r.get('type'))]
+            # Read and classify each in-range candidate once: (facility, distance, name, building)
+            food_candidates = []
+            beverage_candidates = []
+            for r in unique_facilities:
+                distance = r.get('distance', math.inf)
+                if distance > max_distance:
+                    continue
+                name = r.get('name') or ''
+                type_l = (r.get('type') or '').lower()
+                candidate = (r, distance, name, (r.get('building') or '').lower())
+                if type_l == 'beverage' or _BEVERAGE_RE.search(name):
+                    beverage_candidates.append(candidate)
+                elif type_l == 'food' or _FOOD_RE.search(name):
+                    # Keep only food places primarily
+                    food_candidates.append(candidate)
 
             # Sort with custom scoring: by distance, then spine preference, then healthy if requested
-            is_healthy_query = any(word in query_lower for word in ['healthy', 'clean', 'light'])
-            def sort_key(r: Dict[str, Any]):
-                # Lower is better; use negative boosts to improve rank
-                base = r.get('distance', float('inf'))
-                boost = 0
-                boost -= 0.2 * spine_boost(r.get('building'))
-                if is_healthy_query:
-                    boost -= 0.2 * healthy_score(r.get('name'))
-                return base + boost
-
-            food_candidates.sort(key=sort_key)
-            relevant = list(food_candidates)
+            is_healthy_query = bool(_HEALTHY_QUERY_RE.search(query_lower))
+            order = _rank_food_candidates(
+                np.array([distance for _, distance, _, _ in food_candidates], dtype=np.float64),
+                np.array([_spine_boost(building_l) for _, _, _, building_l in food_candidates], dtype=np.int8),
+                np.array([_healthy_score(name) for _, _, name, _ in food_candidates], dtype=np.int8),
+                is_healthy_query
+            )
+            relevant = [food_candidates[i][0] for i in order]
 
             # Only include beverages if we have too few food choices
             if len(relevant) < 2 and beverage_candidates:
-                beverage_candidates.sort(key=lambda r: r.get('distance', float('inf')))
-                relevant.extend(beverage_candidates[:2])  # Limit beverage suggestions
+                beverage_candidates.sort(key=lambda candidate: candidate[1])
+                relevant.extend(r for r, _, _, _ in beverage_candidates[:2])  # Limit beverage suggestions
         else:
             # For other queries, use standard threshold
             max_distance = 1.6
-            relevant = [r for r in unique_facilities if r.get('distance', float('inf')) <= max_distance]
+            relevant = [r for r in unique_facilities if r.get('distance', math.inf) <= max_distance]
         
         # Step 3: Apply day-based filtering if a specific day was mentioned
         if query_day:
             relevant = self._filter_by_day_availability(relevant, query_day)
 
-        # Sort by distance as a final stable sort
-        relevant.sort(key=lambda x: x.get('distance', float('inf')))
+        # Food results keep their spine/healthy ranking (beverage fallbacks last); others sort by distance
+        if not is_food_query:
+            relevant.sort(key=lambda x: x.get('distance', math.inf))
 
         day_info = f" (filtered for {query_day})" if query_day else ""
-        print(f"🎯 Filtered to {len(relevant)} relevant facilities{day_info} (max_distance: {max_distance}) for query type: {query_lower[:30]}...")
+        log.debug("🎯 Filtered to %d relevant facilities%s (max_distance: %s) for query type: %s...", len(relevant), day_info, max_distance, query_lower[:30])
         return relevant
     
-    # def _remove_duplicate_facilities(self, facilities: List[Dict], query_day: str = None) -> List[Dict]:
+    def _remove_duplicate_facilities(self, facilities: List[Dict], query_day: str = None) -> List[Dict]:
         """Remove duplicate facilities, keeping the best match for the query day"""
         if not facilities:
             return []
         
         # Group facilities by name and type
-        facility_groups = {}
+        facility_groups = defaultdict(list)
         for facility in facilities:
-            key = (facility.get('name', ''), facility.get('type', ''))
-            if key not in facility_groups:
-                facility_groups[key] = []
-            facility_groups[key].append(facility)
+            facility_groups[(facility.get('name', ''), facility.get('type', ''))].append(facility)
         
         unique_facilities = []
-        
-        for (name, facility_type), group in facility_groups.items():
-            if len(group) == 1:
-                # No duplicates, add as is
-                unique_facilities.append(group[0])
-            else:
-                # Multiple entries - choose best one for query day
-                best_facility = self._select_best_facility_for_day(group, query_day)
-                if best_facility:
-                    unique_facilities.append(best_facility)
-                    print(f"🔄 Removed {len(group)-1} duplicates for {name}")
+        for (name, _), group in facility_groups.items():
+            # Single entries pass through; duplicates keep the best one for the query day
+            best_facility = group[0] if len(group) == 1 else self._select_best_facility_for_day(group, query_day)
+            if best_facility:
+                unique_facilities.append(best_facility)
+                if len(group) > 1:
+                    log.debug("🔄 Removed %d duplicates for %s", len(group) - 1, name)
         
         return unique_facilities
     
-    # def _select_best_facility_for_day(self, facilities: List[Dict], query_day: str = None) -> Dict:
+    def _select_best_facility_for_day(self, facilities: List[Dict], query_day: str = None) -> Dict:
         """Select the best facility entry from duplicates based on day availability"""
         
         if not query_day:
             # If no specific day, return the one with better distance or first one
-            return min(facilities, key=lambda x: x.get('distance', float('inf')))
+            return min(facilities, key=lambda x: x.get('distance', math.inf))
         
         # Check which entries are available for the query day
         available_for_day = []
@@ -256,18 +649,18 @@ class OpenAISemanticChatService:
                 continue
             
             # Check specific day availability
-            if query_day in open_days:
+            if _is_open_on(facility, query_day):
                 available_for_day.append(facility)
         
         if available_for_day:
             # Return the best available facility (best distance)
-            return min(available_for_day, key=lambda x: x.get('distance', float('inf')))
+            return min(available_for_day, key=lambda x: x.get('distance', math.inf))
         else:
             # None available for the day, don't include any
-            print(f"❌ All entries for {facilities[0].get('name', 'Unknown')} closed on {query_day}")
+            log.debug("❌ All entries for %s closed on %s", facilities[0].get('name', 'Unknown'), query_day)
             return None
     
-    # def _filter_by_day_availability(self, facilities: List[Dict], query_day: str) -> List[Dict]:
+    def _filter_by_day_availability(self, facilities: List[Dict], query_day: str) -> List[Dict]:
         """Filter facilities based on day availability"""
         if not query_day:
             return facilities
@@ -282,187 +675,160 @@ class OpenAISemanticChatService:
             
             # IMPORTANT: If no timing info specified, assume facility is open all day
             if not open_days and not open_time and not close_time:
-                print(f"✅ {facility.get('name', 'Unknown')} - assumed open all day (no timing specified)")
+                log.debug("✅ %s - assumed open all day (no timing specified)", facility.get('name', 'Unknown'))
                 available_facilities.append(facility)
                 continue
             
             # If only open_days is empty but has timing, include facility (might be open daily)
             if not open_days and (open_time or close_time):
-                print(f"✅ {facility.get('name', 'Unknown')} - has timing info, assuming available on {query_day}")
+                log.debug("✅ %s - has timing info, assuming available on %s", facility.get('name', 'Unknown'), query_day)
                 available_facilities.append(facility)
                 continue
             
             # Check if facility is open on the specified day
-            is_open = False
-            
-            if query_day == 'Weekend':
-                is_open = any(day in open_days for day in ['Saturday', 'Sunday'])
-            elif query_day == 'Weekday':
-                is_open = any(day in open_days for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
-            else:
-                is_open = query_day in open_days
-            
-            if is_open:
+            if _is_open_on(facility, query_day):
                 available_facilities.append(facility)
             else:
                 filtered_count += 1
-                print(f"🚫 Filtered out {facility.get('name', 'Unknown')} - closed on {query_day}")
+                log.debug("🚫 Filtered out %s - closed on %s", facility.get('name', 'Unknown'), query_day)
         
         if filtered_count > 0:
-            print(f"📅 Day filtering: {filtered_count} facilities filtered out for {query_day}")
+            log.debug("📅 Day filtering: %d facilities filtered out for %s", filtered_count, query_day)
         
         return available_facilities
     
-    def _generate_openai_response_with_context(self, query: str, facilities: List[Dict], query_day: Optional[str] = None, conversation_history: List[Dict] = None) -> str:
-        
+    def _generate_openai_response_with_context(self, query: str, facilities: List[Dict], query_day: Optional[str] = None, conversation_history: Optional[ConversationBuffer] = None) -> str:
         """Generate conversational response using OpenAI GPT-4 with conversation context"""
+        system_prompt = self._build_system_prompt(facilities, query_day, conversation_history)
+        return self._call_openai_gpt4(system_prompt, query)
+
+    def _build_system_prompt(self, facilities: List[Dict], query_day: Optional[str] = None, conversation_history: Optional[ConversationBuffer] = None) -> str:
+        """Build the system prompt from the static instructions and per-request context"""
 
         conversation_context = ""
         
         # Build conversation context for GPT-4
         if conversation_history:
-            recent_messages = conversation_history[-4:]  # Last 4 messages for context
-            context_parts = []
-            for msg in recent_messages:
-                role = "Human" if msg.get('role') == 'user' else "Assistant"
-                content = msg.get('content', '')
-                context_parts.append(f"{role}: {content}")
-            
-            if context_parts:
-                conversation_context = "Previous conversation:\n" + "\n".join(context_parts) + "\n\n"
+            if not isinstance(conversation_history, ConversationBuffer):
+                conversation_history = ConversationBuffer.from_messages(conversation_history)
+            conversation_context = "Previous conversation:\n" + conversation_history.render() + "\n\n"
 
-        facility_details = []
-        for facility in facilities:
-            details = [
-                f"Name: {facility.get('name', 'Unknown')}",
-                f"Type: {facility.get('type', 'Unknown')}",
-                f"Building: {facility.get('building', 'Unknown')}",
-                f"Unit Number: {facility.get('unit_number', 'Unknown')}",
-                f"Open Time: {facility.get('open_time', 'N/A')}",
-                f"Close Time: {facility.get('close_time', 'N/A')}",
-                f"Open Days: {', '.join(facility.get('open_days', [])) if facility.get('open_days') else 'N/A'}",
-                f"map_url: {facility.get('map_url', 'Not Found')}"
-            ]
-            
-            attrs = facility.get('attrs', {})
-            if attrs:
-                airconditioned = attrs.get('airconditioned', 'Unknown')
-                details.append(f"Aircon: {airconditioned}")
-                
-                booking = attrs.get('booking_required', 'Unknown')
-                details.append(f"Booking Required: {booking if attrs.get('booking_link') else 'No'}")
-                
-                monitor = attrs.get('monitor', 'No')
-                details.append(f"Monitor Available: {monitor}")
-               
-                quiet_policy = attrs.get('quiet_policy', 'N/A')
-                details.append(f"Quiet Policy: {quiet_policy}")
-                
-                power_outlets = attrs.get('power_outlets', 'N/A')
-                details.append(f"Power Outlets: {power_outlets}")
-                
-                cuisine = attrs.get('cuisine', 'N/A')
-                details.append(f"Cuisine: {cuisine}")
-                
-                dine_in = attrs.get('dine_in', 'N/A')
-                details.append(f"Dine-In Available: {dine_in}")
-                
-                takeaway = attrs.get('takeaway_friendly', 'N/A')
-                details.append(f"Takeaway Available: {takeaway}")
-                
-                dish_style = attrs.get('dish_style', 'N/A')
-                details.append(f"Dish Style: {dish_style}")
-                
-                dietry_label = attrs.get('dietary_label', 'N/A')
-                details.append(f"Dietary Label: {dietry_label}")    
-               
-                takeaway_friendly = attrs.get('takeaway_friendly', 'N/A')
-                details.append(f"Takeaway Available: {takeaway_friendly}")
-               
-                serves_breakfast = attrs.get('serves_breakfast', 'N/A')
-                details.append(f"Serve Breakfast: {serves_breakfast}")
-
-                healthy_options_available = attrs.get('healthy_options_available', 'N/A')
-                details.append(f"Healthy Option Available: {healthy_options_available}")
-            
-            facility_details.append(" | ".join(details))
+        # Order facilities by id so the same result set always renders the same prompt
+        facility_details = [
+            _format_facility_details(facility)
+            for facility in sorted(facilities, key=lambda f: f.get('id') or 0)
+        ]
         facilities_context = "\n".join(facility_details) if facility_details else "No specific facilities found."
 
-        system_prompt = f"""You are an intelligent NTU Singapore campus assistant with access to comprehensive knowledge from multiple domains. Provide seamless, unified recommendations by combining database results with your general knowledge about NTU and nutrition science. Avoid claiming specific outlet names or canteen numbers unless they appear in the provided facility list.
-
-            Context: Facilities (result from semantic search): {facilities_context} and previous conversation context: {conversation_context}
-
-            COMPREHENSIVE INTELLIGENCE APPROACH:
-            • Database results + NTU campus knowledge + General domain expertise
-            • Apply your knowledge of nutrition, food science, study habits, facilities management
-            • Use your understanding of what makes food healthy/unhealthy, good study environments, etc.
-            • Give ONE coherent response - don't separate sources or mention where information came from
-            • Prioritize QUALITY, HEALTH, and RELEVANCE over just using available data
-            ENHANCED ANALYSIS WITH GENERAL KNOWLEDGE:
-            1. **Food Classification & Prioritization Intelligence**:
-            - FOOD vs BEVERAGE: When user asks for "food" or "eat", prioritize actual FOOD establishments over beverage shops
-            - FOOD places: Restaurants, cafeterias, food courts, stalls serving meals (pasta, rice, noodles, soup, etc.)
-            - BEVERAGE places: Bubble tea shops, coffee shops, juice bars
-            - If user asks "where can I eat", focus on places that serve substantial meals, not just drinks
-            - Apply your knowledge of healthy vs. unhealthy food types
-            - Understand that "healthy food" means: salads, grilled items, soups, lean proteins, vegetables, fruits
-            - Consider nutritional value, preparation methods, and ingredients
-            - Use your knowledge of dietary restrictions (halal, vegetarian, gluten-free)
-
-            2. **NTU Campus Knowledge Integration (safe usage)**:
-            - North Spine and South Spine are key hubs with multiple amenities and eateries
-            - Prefer options in North/South Spine when making meal recommendations if suitable
-            - Use general campus knowledge (e.g., main spines often have food courts/restaurants),
-            but do NOT invent or assert specific outlet names or canteen numbers unless they are in the provided list
-            - Consider practical factors: walking distance, meal prices, student preferences
-            - Apply your knowledge of optimal study conditions: quiet, good lighting, minimal distractions
-
-            3. **Facility Quality Assessment**:
-            - Use your knowledge of what makes facilities high-quality
-            - Understand cleanliness standards, accessibility, comfort factors
-            - Apply knowledge of peak hours, crowd management, facility maintenance
-
-            4. **Day-Based Intelligence**:
-            - Only suggest facilities that are actually open on the specified day
-            - Completely ignore closed facilities - don't mention them at all
-            - Show only operating hours relevant to the queried day
-
-            RESPONSE REQUIREMENTS:
-            • Give seamless, integrated recommendations using all your knowledge domains
-            • Don't say "from database" or "from my knowledge" - just give the best expert advice
-            • Only name facilities that are in the AVAILABLE FACILITIES list; if using general knowledge, speak in categories (e.g., "food court options", "study pods")
-            • Apply your general knowledge to critically evaluate database suggestions
-            • Lead with the most appropriate recommendations based on quality and suitability
-            • Show only relevant operating hours for the queried day
-            • Completely ignore inappropriate or closed facilities
-            • For food queries: Prioritize actual FOOD places over beverage shops
-            • Sound natural and conversational like a knowledgeable friend helping out
-            • **If a facility includes a `map_url` (navigation link), include it in your response as a clickable link at the end of that facility’s description (e.g., “📍 [View on map](https://maps.ntu.edu.sg/...)”).**
-            • Do not fabricate links; only include them when the `map_url` field is provided.
-
-            Today's Context: {query_day if query_day else 'Current day'} - only show information relevant to this day."""
-        
-        print("System prompt: ", system_prompt)
+        request_context = _canonicalize(_REQUEST_CONTEXT_TEMPLATE.format_map({
+            'facilities_context': facilities_context,
+            'conversation_context': conversation_context,
+            'query_day': query_day or 'Current day'
+        }))
+        return f"{_SYSTEM_INSTRUCTIONS}\n\n{request_context}"
 
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"❌ OpenAI API Error: {e}")
-            return self._generate_fallback_response_with_context(query, facilities, conversation_history)
+    def _prepare_completion(self, system_prompt: str, user_prompt: str) -> Tuple[str, Optional[str], Dict[str, Any]]:
+        """Return the response cache key, any cached response, and the chat completion arguments"""
+        user_prompt = _canonicalize(user_prompt)
+        cache_key = ResponseCache.make_key(model=self.chat_model, system=system_prompt, user=user_prompt)
+        request = {
+            'model': self.chat_model,
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': 0.3,
+            'max_tokens': 500
+        }
+        return cache_key, self.response_cache.get(cache_key), request
+
+    def _finish_completion(self, cache_key: str, content: str, usage: Any) -> str:
+        """Record prompt-cache usage, then cache and return the completion text"""
+        cached_tokens, prompt_tokens = record_prompt_usage(usage)
+        if prompt_tokens:
+            log.debug("📊 Prompt cache ratio %.2f (%d/%d tokens)", cached_tokens / prompt_tokens, cached_tokens, prompt_tokens)
+
+        content = content.strip()
+        log.debug("✅ OpenAI response generated (%d chars)", len(content))
+        self.response_cache.set(cache_key, content)
+        return content
+
+    def _count_prompt_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Tokenize the prompt messages; CPU-bound, so async callers run it off the event loop"""
+        return sum(count_tokens(message['content'], self.chat_model) for message in messages)
+
+    def _call_openai_gpt4(self, system_prompt: str, user_prompt: str) -> str:
+        """Blocking chat completion call, served from the response cache when possible"""
+        cache_key, cached, request = self._prepare_completion(system_prompt, user_prompt)
+        if cached is not None:
+            log.debug("♻️  Response cache hit")
+            return cached
+
+        response = self.openai_client.chat.completions.create(**request)
+        return self._finish_completion(cache_key, response.choices[0].message.content, response.usage)
+
+    async def _acall_openai_gpt4(self, system_prompt: str, user_prompt: str) -> str:
+        """Async chat completion via AsyncOpenAI, paced by the TPM/RPM token bucket"""
+        cache_key, cached, request = self._prepare_completion(system_prompt, user_prompt)
+        if cached is not None:
+            log.debug("♻️  Response cache hit")
+            return cached
+
+        # Reserve prompt + maximum completion tokens before sending, instead of hitting 429s
+        prompt_tokens = await asyncio.to_thread(self._count_prompt_tokens, request['messages'])
+        await self.rate_limiter.acquire(prompt_tokens + request['max_tokens'])
+
+        response = await self.async_openai_client.chat.completions.create(**request)
+        return self._finish_completion(cache_key, response.choices[0].message.content, response.usage)
+
+    async def _astream_openai_gpt4(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Stream a chat completion token by token; the concatenated body goes into the response cache"""
+        cache_key, cached, request = self._prepare_completion(system_prompt, user_prompt)
+        if cached is not None:
+            log.debug("♻️  Response cache hit")
+            yield cached
+            return
+
+        prompt_tokens = await asyncio.to_thread(self._count_prompt_tokens, request['messages'])
+        await self.rate_limiter.acquire(prompt_tokens + request['max_tokens'])
+
+        stream = await self.async_openai_client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        parts = []
+        usage = None
+        async for chunk in stream:
+            # The final chunk carries usage and no choices
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        # Only complete streams are cached; a client disconnect closes the generator before this
+        self._finish_completion(cache_key, "".join(parts), usage)
     
     def _generate_fallback_response_with_context(self, query, facilities, conversation_history):
-     return "Sorry, something went wrong while generating the response. Please try again later."
+        """Build a plain response from the top search result when OpenAI is unavailable"""
+        message = "Sorry, something went wrong while generating the response. Please try again later."
+        if not facilities:
+            return message
+
+        top_facility = facilities[0]
+        facility_id = top_facility.get('id')
+        if facility_id is None:
+            snippet = _format_facility_snippet(top_facility)
+        else:
+            self._facility_by_id.setdefault(facility_id, top_facility)
+            snippet = self._top_facility_snippet(facility_id)
+
+        return f"{message} In the meantime, {snippet}"
+
+    def _render_top_facility_snippet(self, facility_id: int) -> str:
+        """Render the fallback snippet for a known facility (memoized per id)"""
+        return _format_facility_snippet(self._facility_by_id[facility_id])
 
     def load_facilities_from_db(self, db_facilities: List[Dict], update_mode: str = "replace"):
         """
@@ -470,18 +836,21 @@ class OpenAISemanticChatService:
         
         Args:
             db_facilities: List of facility dictionaries from database
-            update_mode: "replace" (clear and reload) or "add" (append only)
+            update_mode: "replace" (sync: re-embed changed facilities, remove missing ones) or "add" (append only)
         """
-        print(f"Loading {len(db_facilities)} facilities into vector database (mode: {update_mode})...")
+        log.info("Loading %d facilities into vector database (mode: %s)...", len(db_facilities), update_mode)
         
-        # If replace mode, clear existing data first
+        # In replace mode only facilities that changed are re-embedded; the rest are removed
         if update_mode == "replace":
-            print("Clearing existing vector database data...")
-            self.vector_db.reset_database()
+            self._facility_by_id.clear()
+
+        # Cached answers were generated from the previous facility data
+        self.semantic_cache.clear()
         
         # Transform database format if needed
         processed_facilities = []
         for facility in db_facilities:
+            attrs = facility.get('attrs') or {}
             processed = {
                 'id': facility.get('id'),
                 'code': facility.get('code'),
@@ -490,17 +859,26 @@ class OpenAISemanticChatService:
                 'building': facility.get('building'),
                 'floor': facility.get('floor'),
                 'unit_number': facility.get('unit_number'),
-                'attrs': facility.get('attrs', {}),
+                'attrs': attrs,
+                'features_str': format_features(attrs),
                 'open_time': str(facility.get('open_time')) if facility.get('open_time') else '',
                 'close_time': str(facility.get('close_time')) if facility.get('close_time') else '',
                 'open_days': facility.get('open_days', []),
                 'map_url': facility.get('map_url', '')
             }
             processed_facilities.append(processed)
+            if processed['id'] is not None:
+                self._facility_by_id[processed['id']] = processed
+
+        # Snippets may describe facilities that were just reloaded
+        self._top_facility_snippet.cache_clear()
         
         # Add to vector database
-        self.vector_db.add_facilities(processed_facilities)
-        print(f"✅ Successfully loaded {len(processed_facilities)} facilities with OpenAI integration")
+        if update_mode == "replace":
+            self.vector_db.sync_facilities(processed_facilities)
+        else:
+            self.vector_db.add_facilities(processed_facilities)
+        log.info("✅ Successfully loaded %d facilities with OpenAI integration", len(processed_facilities))
         
         return {
             "message": f"Loaded {len(processed_facilities)} facilities into vector database",
@@ -510,4 +888,10 @@ class OpenAISemanticChatService:
 
 
 # For backward compatibility, create an alias
-SemanticChatService = OpenAISemanticChatService
\ No newline at end of file
+SemanticChatService = OpenAISemanticChatService
+
+
+@functools.lru_cache(maxsize=1)
+def get_chat_service() -> OpenAISemanticChatService:
+    """Process-wide service instance: .env, OpenAI clients and the vector DB are set up exactly once"""
+    return OpenAISemanticChatService()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+pgvector Storage Backend for NTU Facilities Semantic Search
+Keeps facility embeddings in a halfvec column on core.facilities with an HNSW index (VECTOR_BACKEND=pgvector)
+"""
+
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from .database import engine
+from .vector_db_service import FacilityVectorDB, encode_attrs_mask, encode_days_mask, format_features
+
+_SEARCH_SQL = """
+    SELECT id, code, name, type, building, floor, unit_number, open_time, close_time,
+           open_days, attrs, map_url, embedding_document, embedding <=> CAST(:query AS halfvec) AS distance
+    FROM core.facilities
+    WHERE embedding IS NOT NULL{filters}
+    ORDER BY embedding <=> CAST(:query AS halfvec)
+    LIMIT :limit
+"""
+
+# Metadata fields a build_facility_where filter may reference, and the columns that hold them
+_FILTER_COLUMNS = {'type': 'type', 'building': 'building', 'days_mask': 'days_mask', 'attrs_mask': 'attrs_mask'}
+
+
+def _to_vector_literal(embedding) -> str:
+    return "[" + ",".join(f"{float(x):.7g}" for x in embedding) + "]"
+
+
+def _where_to_sql(where: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """Translate a Chroma-style $and/$eq/$in filter (as built by build_facility_where) into SQL conditions"""
+    if not where:
+        return "", {}
+    clauses = where['$and'] if '$and' in where else [where]
+    conditions, params = [], {}
+    for i, clause in enumerate(clauses):
+        (field, condition), = clause.items()
+        (operator, value), = condition.items()
+        column = _FILTER_COLUMNS[field]
+        if operator == '$eq':
+            conditions.append(f"{column} = :filter_{i}")
+        elif operator == '$in':
+            conditions.append(f"{column} = ANY(:filter_{i})")
+        else:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        params[f"filter_{i}"] = value
+    return "".join(f" AND {condition}" for condition in conditions), params
+
+
+class PgVectorFacilityDB(FacilityVectorDB):
+    """FacilityVectorDB that stores and searches embeddings in PostgreSQL instead of ChromaDB"""
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self._init_embeddings(cache_path or os.getenv('EMBEDDING_CACHE_PATH', './embedding_cache.sqlite3'))
+        self.engine = engine
+        self.ef_search = int(os.getenv('PGVECTOR_EF_SEARCH', '100'))
+        self._ensure_schema()
+
+        print(f"pgvector DB initialized. Indexed facilities: {self._count_indexed()}")
+
+    def _ensure_schema(self):
+        """Add the embedding columns and HNSW index to core.facilities if missing"""
+        dimension = self.embedding_model.get_sentence_embedding_dimension()
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            conn.execute(text(f"ALTER TABLE core.facilities ADD COLUMN IF NOT EXISTS embedding halfvec({dimension})"))
+            conn.execute(text("ALTER TABLE core.facilities ADD COLUMN IF NOT EXISTS embedding_doc_hash text"))
+            # The embedded text, so search hits don't rebuild it
+            conn.execute(text("ALTER TABLE core.facilities ADD COLUMN IF NOT EXISTS embedding_document text"))
+            # Filterable bitmasks of open days and attribute flags (see build_facility_where)
+            conn.execute(text("ALTER TABLE core.facilities ADD COLUMN IF NOT EXISTS days_mask integer"))
+            conn.execute(text("ALTER TABLE core.facilities ADD COLUMN IF NOT EXISTS attrs_mask integer"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS facilities_embedding_hnsw ON core.facilities "
+                "USING hnsw (embedding halfvec_cosine_ops) WITH (m = 24, ef_construction = 128)"
+            ))
+
+    def _count_indexed(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM core.facilities WHERE embedding IS NOT NULL")).scalar() or 0
+
+    def _write_embeddings(self, facilities: List[Dict[str, Any]], only_changed: bool = True) -> int:
+        """Embed facility documents and store them on their rows; returns how many rows were written"""
+        documents = [self.create_facility_document(facility) for facility in facilities]
+        hashes = [self.document_hash(document) for document in documents]
+        ids = [facility.get('id') for facility in facilities]
+
+        with self.engine.begin() as conn:
+            current = {}
+            if only_changed and ids:
+                rows = conn.execute(
+                    text("SELECT id, embedding_doc_hash FROM core.facilities WHERE id = ANY(:ids)"),
+                    {'ids': ids}
+                )
+                current = dict(rows.all())
+
+            changed = [i for i, facility_id in enumerate(ids) if current.get(facility_id) != hashes[i]]
+            if changed:
+                embeddings = self.embed_documents([documents[i] for i in changed])
+                conn.execute(
+                    text("UPDATE core.facilities SET embedding = CAST(:embedding AS halfvec), embedding_doc_hash = :doc_hash, "
+                         "embedding_document = :document WHERE id = :id"),
+                    [
+                        {'id': ids[i], 'embedding': _to_vector_literal(embedding), 'doc_hash': hashes[i], 'document': documents[i]}
+                        for i, embedding in zip(changed, embeddings)
+                    ]
+                )
+                self.version += 1
+
+            # Masks can change without the document text changing, so refresh them for every facility
+            if ids:
+                masks = conn.execute(
+                    text("UPDATE core.facilities SET days_mask = :days_mask, attrs_mask = :attrs_mask WHERE id = :id "
+                         "AND (days_mask IS DISTINCT FROM :days_mask OR attrs_mask IS DISTINCT FROM :attrs_mask)"),
+                    [
+                        {'id': facility_id, 'days_mask': encode_days_mask(facility.get('open_days')),
+                         'attrs_mask': encode_attrs_mask(facility.get('attrs'))}
+                        for facility_id, facility in zip(ids, facilities)
+                    ]
+                )
+                if masks.rowcount and not changed:
+                    self.version += 1
+        return len(changed)
+
+    def add_facilities(self, facilities: List[Dict[str, Any]]):
+        """Add facilities to vector database"""
+        print(f"Adding {len(facilities)} facilities to pgvector...")
+        written = self._write_embeddings(facilities)
+        print(f"Embedded {written} facilities. Total indexed: {self._count_indexed()}")
+
+    def sync_facilities(self, facilities: List[Dict[str, Any]]):
+        """Embed new or changed facilities and clear embeddings of facilities not in the list"""
+        print(f"Syncing {len(facilities)} facilities to pgvector...")
+        written = self._write_embeddings(facilities)
+        with self.engine.begin() as conn:
+            cleared = conn.execute(
+                text("UPDATE core.facilities SET embedding = NULL, embedding_doc_hash = NULL, embedding_document = NULL "
+                     "WHERE embedding IS NOT NULL AND NOT (id = ANY(:ids))"),
+                {'ids': [facility.get('id') for facility in facilities]}
+            ).rowcount
+        if cleared:
+            self.version += 1
+        print(f"Synced facilities: {written} embedded, {cleared} cleared, "
+              f"{len(facilities) - written} unchanged. Total indexed: {self._count_indexed()}")
+
+    def update_facility(self, facility: Dict[str, Any]):
+        """Update a single facility in the vector database"""
+        if self._write_embeddings([facility]):
+            print(f"Updated facility: {facility.get('name')}")
+        else:
+            print(f"Facility unchanged, skipped update: {facility.get('name')}")
+
+    def delete_facility(self, facility_id: int):
+        """Delete a facility from vector database"""
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("UPDATE core.facilities SET embedding = NULL, embedding_doc_hash = NULL, embedding_document = NULL WHERE id = :id"),
+                {'id': facility_id}
+            )
+        self.version += 1
+        print(f"Deleted facility ID: {facility_id}")
+
+    def semantic_search_batch(self, queries: List[str], n_results: int = 10, query_embeddings: Optional[np.ndarray] = None,
+                              where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Perform semantic search for several queries in one transaction, optionally within a build_facility_where filter"""
+        print(f"Performing semantic search for {len(queries)} queries: {queries}")
+
+        if query_embeddings is None:
+            query_embeddings = self.embed_queries(queries)
+
+        filters, filter_params = _where_to_sql(where)
+        search_sql = text(_SEARCH_SQL.format(filters=filters))
+
+        batch = []
+        with self.engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL hnsw.ef_search = {self.ef_search}"))
+            for embedding in query_embeddings:
+                rows = conn.execute(search_sql, {'query': _to_vector_literal(embedding), 'limit': n_results, **filter_params}).mappings()
+                facilities = []
+                for row in rows:
+                    attrs = row['attrs'] or {}
+                    open_days = row['open_days'] or []
+                    facility = {
+                        'id': row['id'],
+                        'name': row['name'],
+                        'type': (row['type'] or '').replace('_', ' '),  # Replace underscores with spaces
+                        'building': row['building'] or '',
+                        'floor': str(row['floor'] or ''),
+                        'unit_number': row['unit_number'] or '',
+                        'open_time': str(row['open_time'] or ''),
+                        'close_time': str(row['close_time'] or ''),
+                        'open_days': open_days,
+                        'attrs': attrs,
+                        'days_mask': encode_days_mask(open_days),
+                        'attrs_mask': encode_attrs_mask(attrs),
+                        'features_str': format_features(attrs),
+                        'code': row['code'] or '',
+                        'map_url': row['map_url'] or '',
+                        # Cosine distance x2 equals squared L2 between unit vectors, the scale Chroma reports
+                        'distance': 2 * row['distance']
+                    }
+                    # Rows embedded before embedding_document existed rebuild the text
+                    facility['matched_text'] = row['embedding_document'] or self.create_facility_document(facility)
+                    facilities.append(facility)
+                batch.append(facilities)
+
+        print(f"Found {sum(len(facilities) for facilities in batch)} semantic matches")
+        return batch
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Get statistics about the vector database"""
+        with self.engine.connect() as conn:
+            sample_names = conn.execute(
+                text("SELECT name FROM core.facilities WHERE embedding IS NOT NULL ORDER BY id LIMIT 5")
+            ).scalars().all()
+        return {
+            'total_facilities': self._count_indexed(),
+            'collection_name': 'core.facilities (pgvector)',
+            'sample_facilities': list(sample_names)
+        }
+
+    def _clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE core.facilities SET embedding = NULL, embedding_doc_hash = NULL, embedding_document = NULL"))
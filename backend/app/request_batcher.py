@@ -0,0 +1,87 @@
+"""
+Request Batcher for Concurrent Chat Queries
+Coalesces requests arriving within a short window into a single batch call
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class RequestBatcher:
+    """Collect submitted items and flush them to batch_fn when the batch is full or the window closes"""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[List[Any]]], max_batch_size: int = 8, max_wait: float = 0.03):
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The event loop only keeps weak references to tasks, so running ones are held here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its entry in the batch result"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = self._spawn(loop, self._collect())
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without waiting so the next window can fill while this batch runs
+            self._spawn(loop, self._dispatch(batch))
+
+    def _spawn(self, loop: asyncio.AbstractEventLoop, coro: Awaitable[Any]) -> asyncio.Task:
+        task = loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("❌ Request batcher task failed", exc_info=task.exception())
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self._batch_fn([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._settle(batch[0][1], error=e)
+                return
+            # Retry items one by one so a single bad item fails only its own caller
+            await asyncio.gather(*[self._dispatch([entry]) for entry in batch])
+        else:
+            for (_, future), result in zip(batch, results):
+                self._settle(future, result=result)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None):
+        # A caller that was cancelled while waiting has already resolved its future
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
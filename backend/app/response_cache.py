@@ -0,0 +1,180 @@
+"""
+Response Caches for OpenAI Chat Completions
+Bounded in-process exact-match and semantic-similarity caches with TTL expiry and LRU eviction
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from cachetools import TTLCache
+
+from .metrics import CACHE_EVENTS
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that records how many entries were evicted or expired"""
+
+    def __init__(self, maxsize: int, ttl: float, name: str):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.evictions = 0
+        self.expirations = 0
+        self._evicted_metric = CACHE_EVENTS.labels(cache=name, event='eviction')
+        self._expired_metric = CACHE_EVENTS.labels(cache=name, event='expiration')
+
+    def popitem(self):
+        # Only called when the cache is full and the LRU entry must go
+        item = super().popitem()
+        self.evictions += 1
+        self._evicted_metric.inc()
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self.expirations += len(expired)
+            self._expired_metric.inc(len(expired))
+        return expired
+
+
+class ResponseCache:
+    """Thread-safe exact-match cache of generated responses"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600, name: str = 'response'):
+        self._cache = _CountingTTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_metric = CACHE_EVENTS.labels(cache=name, event='hit')
+        self._miss_metric = CACHE_EVENTS.labels(cache=name, event='miss')
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Hash the prompt components into a fixed-size cache key"""
+        return hashlib.sha256(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+                self._miss_metric.inc()
+            else:
+                self.hits += 1
+                self._hit_metric.inc()
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss/eviction counters"""
+        with self._lock:
+            self._cache.expire()
+            return {
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self._cache.evictions,
+                'expirations': self._cache.expirations
+            }
+
+
+class SemanticResponseCache:
+    """Similarity cache of responses keyed on unit-normalized query embeddings"""
+
+    def __init__(self, threshold: float = 0.97, maxsize: int = 5000, ttl: float = 3600, name: str = 'semantic'):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # slot -> (fingerprint, expires_at, response), oldest first for LRU eviction
+        self._entries: 'OrderedDict[int, Tuple[str, float, str]]' = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_metric = CACHE_EVENTS.labels(cache=name, event='hit')
+        self._miss_metric = CACHE_EVENTS.labels(cache=name, event='miss')
+        self._evicted_metric = CACHE_EVENTS.labels(cache=name, event='eviction')
+
+    def lookup(self, embedding: np.ndarray, fingerprint: str) -> Optional[str]:
+        """Return the cached response of the most similar query above the threshold"""
+        with self._lock:
+            if self._entries:
+                scores = self._vectors[:self._next_slot] @ embedding
+                candidates = np.flatnonzero(scores >= self.threshold)
+                now = time.monotonic()
+                for slot in candidates[np.argsort(-scores[candidates])]:
+                    entry = self._entries.get(int(slot))
+                    if entry is None or entry[0] != fingerprint:
+                        continue
+                    if entry[1] < now:
+                        self._release(int(slot))
+                        continue
+                    self._entries.move_to_end(int(slot))
+                    self.hits += 1
+                    self._hit_metric.inc()
+                    return entry[2]
+
+            self.misses += 1
+            self._miss_metric.inc()
+            return None
+
+    def store(self, embedding: np.ndarray, fingerprint: str, response: str):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, embedding.shape[0]), dtype=np.float32)
+
+            if len(self._entries) >= self.maxsize:
+                oldest, _ = self._entries.popitem(last=False)
+                self._release(oldest, evicted=True)
+
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = self._next_slot
+                self._next_slot += 1
+
+            self._vectors[slot] = embedding
+            self._entries[slot] = (fingerprint, time.monotonic() + self.ttl, response)
+
+    def _release(self, slot: int, evicted: bool = False):
+        self._entries.pop(slot, None)
+        # A zero vector never clears the similarity threshold
+        self._vectors[slot] = 0.0
+        self._free_slots.append(slot)
+        if evicted:
+            self.evictions += 1
+            self._evicted_metric.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            self._free_slots.clear()
+            self._next_slot = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
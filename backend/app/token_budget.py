@@ -0,0 +1,83 @@
+"""
+Token Budget Utilities for OpenAI Requests
+Token counting with tiktoken and a token-bucket limiter for TPM/RPM quotas
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Optional
+
+import tiktoken
+
+log = logging.getLogger(__name__)
+
+# Rough characters per token for English text, used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding_for(model: str) -> Optional[tiktoken.Encoding]:
+    """The model's tokenizer, or None when it cannot be loaded (tiktoken downloads encodings on first use)"""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Cached like a success, so an offline process doesn't retry the download on every call
+        log.warning("⚠️  tiktoken encoding unavailable (%s); estimating tokens from text length", e)
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Count the tokens the given model's tokenizer produces for text, or estimate them without a tokenizer"""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+class TokenBucketRateLimiter:
+    """Async token bucket enforcing tokens-per-minute and requests-per-minute budgets"""
+
+    def __init__(self, tpm_limit: int = 200_000, rpm_limit: int = 1200):
+        self.tpm_limit = tpm_limit
+        self.rpm_limit = rpm_limit
+        self._tokens = float(tpm_limit)
+        self._requests = float(rpm_limit)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.tpm_limit, self._tokens + elapsed * self.tpm_limit / 60)
+        self._requests = min(self.rpm_limit, self._requests + elapsed * self.rpm_limit / 60)
+
+    async def acquire(self, tokens: int):
+        """Wait until the budget covers one request costing the given tokens, then reserve it"""
+        tokens = min(tokens, self.tpm_limit)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens and self._requests >= 1:
+                    self._tokens -= tokens
+                    self._requests -= 1
+                    return
+
+                # Back off just long enough for the bucket to refill
+                await asyncio.sleep(max(
+                    (tokens - self._tokens) * 60 / self.tpm_limit,
+                    (1 - self._requests) * 60 / self.rpm_limit
+                ))
@@ -0,0 +1,215 @@
+"""
+USearch Storage Backend for NTU Facilities Semantic Search
+Keeps facility embeddings in a half-precision USearch HNSW index with SIMD cosine kernels (VECTOR_BACKEND=usearch)
+"""
+
+import os
+import threading
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import orjson
+from usearch.index import Index, Matches
+
+from .vector_db_service import FacilityVectorDB, matches_where
+
+
+class UsearchFacilityDB(FacilityVectorDB):
+    """FacilityVectorDB that stores embeddings in a USearch index and documents/metadata in a JSON sidecar"""
+
+    def __init__(self, persist_directory: str = "./usearch_db"):
+        os.makedirs(persist_directory, exist_ok=True)
+        self._init_embeddings(os.path.join(persist_directory, "embedding_cache.sqlite3"))
+        self._index_path = os.path.join(persist_directory, "facilities.usearch")
+        self._records_path = os.path.join(persist_directory, "facilities.json")
+        self._write_lock = threading.Lock()
+
+        # f16 vectors halve memory and bandwidth; cosine on unit vectors ranks exactly like Chroma's l2
+        self.index = Index(
+            ndim=self.embedding_model.get_sentence_embedding_dimension(),
+            metric='cos',
+            dtype='f16',
+            connectivity=24,
+            expansion_add=128,
+            expansion_search=int(os.getenv('USEARCH_EXPANSION_SEARCH', '100'))
+        )
+        # facility key -> (document, metadata)
+        self.records: Dict[int, tuple] = {}
+        if os.path.exists(self._index_path) and os.path.exists(self._records_path):
+            self.index.load(self._index_path)
+            with open(self._records_path, 'rb') as f:
+                self.records = {int(key): tuple(record) for key, record in orjson.loads(f.read()).items()}
+
+        print(f"USearch DB initialized. Indexed facilities: {len(self.records)}")
+
+    @staticmethod
+    def _key(facility_id: Any) -> Optional[int]:
+        """USearch key of a facility id, or None when the facility has no integer id"""
+        try:
+            return int(facility_id)
+        except (TypeError, ValueError):
+            return None
+
+    def _prepare_keyed_records(self, facilities: List[Dict[str, Any]]):
+        """USearch keys, documents and metadata of facilities, skipping those without an integer id"""
+        # Vectors are keyed by facility id, so a missing id can't fall back to a list position as in Chroma
+        keyed = [facility for facility in facilities if self._key(facility.get('id')) is not None]
+        if len(keyed) < len(facilities):
+            print(f"Skipped {len(facilities) - len(keyed)} facilities without an integer id")
+        _, documents, metadatas = self._prepare_records(keyed)
+        return [self._key(facility['id']) for facility in keyed], documents, metadatas
+
+    def _save(self):
+        self.index.save(self._index_path)
+        with open(self._records_path, 'wb') as f:
+            f.write(orjson.dumps({str(key): record for key, record in self.records.items()}))
+
+    def _upsert(self, keys: List[int], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: Optional[List[List[float]]] = None):
+        """Replace the vectors of keys when embeddings are given, and their stored documents and metadata"""
+        if embeddings is not None:
+            # Every stored record has a vector, so the records double as the index's key set
+            present = [key for key in keys if key in self.records]
+            if present:
+                self.index.remove(np.array(present, dtype=np.uint64))
+            self.index.add(np.array(keys, dtype=np.uint64), np.asarray(embeddings, dtype=np.float16))
+        for key, document, metadata in zip(keys, documents, metadatas):
+            self.records[key] = (document, metadata)
+
+    def _remove(self, keys: List[int]):
+        present = [key for key in keys if key in self.records]
+        if present:
+            self.index.remove(np.array(present, dtype=np.uint64))
+            for key in present:
+                del self.records[key]
+
+    def add_facilities(self, facilities: List[Dict[str, Any]]):
+        """Add facilities to vector database"""
+        print(f"Adding {len(facilities)} facilities to USearch...")
+
+        keys, documents, metadatas = self._prepare_keyed_records(facilities)
+
+        # Like Chroma's add, facilities already in the index are left untouched
+        new = [i for i, key in enumerate(keys) if key not in self.records]
+        if new:
+            new_documents = [documents[i] for i in new]
+            with self._write_lock:
+                self._upsert([keys[i] for i in new], new_documents, [metadatas[i] for i in new],
+                             self.embed_documents(new_documents))
+                self._save()
+            self.version += 1
+
+        print(f"Added {len(new)} facilities. Total in DB: {len(self.records)}")
+
+    def sync_facilities(self, facilities: List[Dict[str, Any]]):
+        """Make the index match facilities: upsert new or changed ones, delete the rest"""
+        print(f"Syncing {len(facilities)} facilities to USearch...")
+
+        keys, documents, metadatas = self._prepare_keyed_records(facilities)
+
+        with self._write_lock:
+            changed = [i for i, key in enumerate(keys) if self.records.get(key, (None, None))[1] != metadatas[i]]
+            stale = list(self.records.keys() - set(keys))
+
+            # Only rows whose document hash moved need a new vector
+            reembed = [i for i in changed if self.records.get(keys[i], (None, {}))[1].get('doc_hash') != metadatas[i]['doc_hash']]
+            metadata_only = sorted(set(changed) - set(reembed))
+
+            self._remove(stale)
+            if reembed:
+                reembed_documents = [documents[i] for i in reembed]
+                self._upsert([keys[i] for i in reembed], reembed_documents, [metadatas[i] for i in reembed],
+                             self.embed_documents(reembed_documents))
+            self._upsert([keys[i] for i in metadata_only], [documents[i] for i in metadata_only], [metadatas[i] for i in metadata_only])
+
+            if stale or changed:
+                self._save()
+                self.version += 1
+
+        print(f"Synced facilities: {len(changed)} upserted, {len(stale)} deleted, "
+              f"{len(keys) - len(changed)} unchanged. Total in DB: {len(self.records)}")
+
+    def update_facility(self, facility: Dict[str, Any]):
+        """Update a single facility in the vector database"""
+        key = self._key(facility.get('id'))
+        if key is None:
+            print(f"Skipped update of facility without an integer id: {facility.get('name')}")
+            return
+        document = self.create_facility_document(facility)
+        metadata = self._facility_metadata(facility, document)
+
+        with self._write_lock:
+            current = self.records.get(key, (None, None))[1]
+            if current == metadata:
+                print(f"Facility unchanged, skipped update: {facility.get('name')}")
+                return
+
+            # Only re-embed when the document text changed
+            same_text = current is not None and current.get('doc_hash') == metadata['doc_hash']
+            self._upsert([key], [document], [metadata], None if same_text else self.embed_documents([document]))
+            self._save()
+            self.version += 1
+
+        print(f"Updated facility: {facility.get('name')}")
+
+    def delete_facility(self, facility_id: int):
+        """Delete a facility from vector database"""
+        with self._write_lock:
+            self._remove([facility_id])
+            self._save()
+        self.version += 1
+        print(f"Deleted facility ID: {facility_id}")
+
+    def semantic_search_batch(self, queries: List[str], n_results: int = 10, query_embeddings: Optional[np.ndarray] = None,
+                              where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Perform semantic search for several queries, optionally within a build_facility_where filter"""
+        print(f"Performing semantic search for {len(queries)} queries: {queries}")
+
+        if query_embeddings is None:
+            query_embeddings = self.embed_queries(queries)
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+
+        batch = [[] for _ in queries]
+        if not self.records:
+            return batch
+
+        if where:
+            # The catalogue is small, so a filtered query is an exact scan over the matching vectors
+            allowed = np.array([key for key, (_, metadata) in self.records.items() if matches_where(metadata, where)], dtype=np.uint64)
+            if len(allowed):
+                vectors = np.asarray(self.index.get(allowed), dtype=np.float32)
+                distances = 1 - query_embeddings @ vectors.T
+                order = np.argsort(distances, axis=1, kind='stable')[:, :n_results]
+                hits = [(allowed[row], distances[q, row]) for q, row in enumerate(order)]
+            else:
+                hits = [(allowed, np.empty(0)) for _ in queries]
+        else:
+            matches = self.index.search(query_embeddings, min(n_results, len(self.records)))
+            if isinstance(matches, Matches):
+                # A one-row query comes back as a single Matches, already trimmed to its hits
+                hits = [(matches.keys, matches.distances)]
+            else:
+                hits = [(matches.keys[q][:matches.counts[q]], matches.distances[q][:matches.counts[q]]) for q in range(len(queries))]
+
+        for facilities, (keys, distances) in zip(batch, hits):
+            # Scale and unbox each row in one vectorized step rather than per hit.
+            # Cosine distance x2 equals squared L2 between unit vectors, the scale Chroma reports
+            for key, distance in zip(keys.tolist(), (2 * np.asarray(distances, dtype=np.float32)).tolist()):
+                document, metadata = self.records[key]
+                facilities.append(self._facility_from_metadata(metadata, document, distance))
+
+        print(f"Found {sum(len(facilities) for facilities in batch)} semantic matches")
+        return batch
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Get statistics about the vector database"""
+        return {
+            'total_facilities': len(self.records),
+            'collection_name': 'facilities (usearch)',
+            'sample_facilities': [metadata.get('name', 'Unnamed') for _, metadata in list(self.records.values())[:5]]
+        }
+
+    def _clear(self):
+        with self._write_lock:
+            self.index.clear()
+            self.records.clear()
+            self._save()
@@ -6,10 +6,136 @@ Uses ChromaDB for vector storage and sentence-transformers for embeddings
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
-import json
+import functools
+import hashlib
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import numpy as np
+import orjson
+from .embedding_cache import EmbeddingCache, PostgresEmbeddingCache
+
+# Facility attribute flags and the phrases they add to the semantic document, in order
+_ATTR_DESCRIPTIONS = (
+    ('aircon', "air conditioning available"),
+    ('quiet_zone', "quiet study environment"),
+    ('outlet', "power outlets for charging devices"),
+    ('monitor', "computer monitors and screens"),
+    ('whiteboard', "whiteboard for presentations"),
+    ('projector', "projector for presentations"),
+    ('halal', "halal food options"),
+    ('vegetarian', "vegetarian food options"),
+    ('dine_in', "dine-in seating available"),
+    ('takeaway', "takeaway options"),
+)
+
+# Bitmask encodings of the boolean attribute flags and open days (bit0 = Monday), stored as
+# scalar metadata so availability/feature checks are a single AND instead of a list or dict scan
+ATTR_BITS = {key: 1 << bit for bit, (key, _) in enumerate(_ATTR_DESCRIPTIONS)}
+DAY_BITS = {day: 1 << bit for bit, day in enumerate(
+    ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+)}
+
+
+def encode_attrs_mask(attrs: Optional[Dict[str, Any]]) -> int:
+    """Fold the truthy boolean attribute flags of a facility into an ATTR_BITS mask"""
+    if not attrs:
+        return 0
+    return sum(bit for key, bit in ATTR_BITS.items() if attrs.get(key))
+
+
+def format_features(attrs: Optional[Dict[str, Any]]) -> str:
+    """Comma-separated names of the boolean attribute flags that are set (values like capacity or level are not features)"""
+    return ", ".join(k.replace('_', ' ') for k, v in (attrs or {}).items() if v is True)
+
+
+def encode_days_mask(open_days: Optional[List[str]]) -> int:
+    """Fold a list of day names into a DAY_BITS mask (unknown names are ignored)"""
+    return sum(DAY_BITS.get(day, 0) for day in set(open_days or ()))
+
+
+def build_facility_where(facility_type: Optional[str] = None, building: Optional[str] = None,
+                         open_days_mask: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Chroma `where` filter for facility constraints, so HNSW returns the true top-k among matching facilities.
+    Chroma has no bitwise operators, so mask constraints are expressed as $in over every mask that satisfies them.
+    """
+    clauses = []
+    if facility_type:
+        clauses.append({'type': {'$eq': facility_type}})
+    if building:
+        clauses.append({'building': {'$eq': building}})
+    if open_days_mask:
+        # Facilities without open days are assumed to be open every day
+        clauses.append({'days_mask': {'$in': [mask for mask in range(1 << len(DAY_BITS)) if not mask or mask & open_days_mask]}})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def _where_fields(where: Dict[str, Any]) -> set:
+    """Metadata fields a build_facility_where filter references"""
+    return {field for clause in (where['$and'] if '$and' in where else [where]) for field in clause}
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style $and/$eq/$in filter (as built by build_facility_where) against stored metadata"""
+    if not where:
+        return True
+    for clause in where['$and'] if '$and' in where else [where]:
+        (field, condition), = clause.items()
+        (operator, value), = condition.items()
+        if operator == '$eq':
+            if metadata.get(field) != value:
+                return False
+        elif operator == '$in':
+            if metadata.get(field) not in value:
+                return False
+        else:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+    return True
+
+
+# Contextual descriptions based on facility type
+_TYPE_CONTEXT = {
+    'study_area': "Perfect for studying, reading, research, homework, and academic work",
+    'discussion_area': "Ideal for group discussions, meetings, team work, and presentations",
+    'food': "Food and dining options, restaurant, meals, eating",
+    'beverage': "Drinks, coffee, tea, beverages, refreshments",
+}
+
+@functools.lru_cache(maxsize=8192)
+def _decode_metadata_json(text: str) -> Any:
+    """Parse a stored metadata JSON string once; keyed on the text, so edits never go stale (treat as read-only)"""
+    return orjson.loads(text)
+
+class _StaticModelEncoder:
+    """SentenceTransformer-compatible encode() over a Model2Vec static embedding (token lookup + mean, no transformer)"""
+    
+    def __init__(self, path: str):
+        from model2vec import StaticModel
+        self._model = StaticModel.from_pretrained(path)
+    
+    def encode(self, sentences: List[str], batch_size: int = 1024, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        embeddings = self._model.encode(list(sentences), batch_size=batch_size, show_progress_bar=show_progress_bar)
+        if normalize_embeddings:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._model.dim
+
+class _SentenceTransformerEmbeddingFunction:
+    """Chroma embedding function backed by the service's SentenceTransformer"""
+    
+    def __init__(self, model: Any):
+        self._model = model
+    
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self._model.encode(list(input), convert_to_numpy=True, normalize_embeddings=True).tolist()
 
 class FacilityVectorDB:
     def __init__(self, persist_directory: str = "./chroma_db"):
@@ -18,16 +144,91 @@ class FacilityVectorDB:
         # Initialize ChromaDB client with persistence
         self.client = chromadb.PersistentClient(path=persist_directory)
         
-        # Initialize sentence transformer model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self._init_embeddings(os.path.join(persist_directory, "embedding_cache.sqlite3"))
         
         # Get or create collection
-        self.collection = self.client.get_or_create_collection(
+        self.collection = self._get_collection()
+        # (version, metadata of every row), for checking where filters without a query per search
+        self._filter_metadata = None
+        
+        count = self.collection.count()
+        if count:
+            # Load the HNSW index into memory before serving traffic
+            self.collection.query(query_texts=['warmup'], n_results=1)
+        
+        print(f"Vector DB initialized. Collection size: {count}")
+    
+    def _init_embeddings(self, cache_path: str):
+        """Load the embedding model and open the persistent document embedding cache"""
+        # Initialize sentence transformer model (ONNX int8 by default; EMBEDDING_BACKEND=torch for FP32,
+        # or model2vec for a static embedding distilled from the same model)
+        self.embedding_model_id = 'all-MiniLM-L6-v2'
+        backend = os.getenv('EMBEDDING_BACKEND', 'onnx')
+        if backend == 'model2vec':
+            variant = os.getenv('EMBEDDING_MODEL2VEC_PATH', 'ntu_m2v')
+            self.embedding_model = _StaticModelEncoder(variant)
+        else:
+            model_path = self.embedding_model_id
+            variant = ''
+            if backend == 'onnx':
+                # Prefer the fused + int8 export baked by build_embedding_model.py, then the hub's int8 export
+                model_dir = os.getenv('EMBEDDING_MODEL_DIR', 'models/all-MiniLM-L6-v2')
+                variant = os.getenv('EMBEDDING_ONNX_FILE', 'onnx/model_O3_qint8_avx512_vnni.onnx')
+                if os.path.exists(os.path.join(model_dir, variant)):
+                    model_path = model_dir
+                elif 'EMBEDDING_ONNX_FILE' not in os.environ:
+                    variant = 'onnx/model_qint8_avx512_vnni.onnx'
+            self.embedding_model = SentenceTransformer(
+                model_path,
+                backend=backend,
+                model_kwargs=self._onnx_model_kwargs(variant) if backend == 'onnx' else None
+            )
+        
+        # Vectors from different backends are not interchangeable, so the backend is part of the
+        # embedding cache key and of every stored document hash
+        self.embedding_version = f"{self.embedding_model_id}:{backend}:{variant}"
+        
+        # Document embeddings persist next to the collection (or in Postgres with EMBEDDING_CACHE_BACKEND=postgres,
+        # which outlives the chroma_db directory) so restarts skip re-encoding
+        if os.getenv('EMBEDDING_CACHE_BACKEND', 'sqlite') == 'postgres':
+            from .database import engine
+            self.embedding_cache = PostgresEmbeddingCache(engine, model_id=self.embedding_version)
+        else:
+            self.embedding_cache = EmbeddingCache(cache_path, model_id=self.embedding_version)
+        
+        # Bumped on every write so callers can key caches of search results on it
+        self.version = 0
+        
+        # Pay tokenizer init, weight paging and ONNX graph optimization now, not on the first user query
+        self.embedding_model.encode(['warmup'] * 8, batch_size=8, show_progress_bar=False)
+    
+    @staticmethod
+    def _onnx_model_kwargs(file_name: str) -> Dict[str, Any]:
+        """ONNX Runtime options; one intra-op thread per session so concurrent encodes scale across cores instead of oversubscribing them"""
+        import onnxruntime
+        
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = int(os.getenv('EMBEDDING_INTRA_OP_THREADS', '1'))
+        return {'file_name': file_name, 'session_options': session_options}
+    
+    def _get_collection(self):
+        # HNSW settings only apply when the collection is created (first run or reset_database)
+        # Chroma embeds with our model too, so any text-only add/query matches the stored vectors
+        return self.client.get_or_create_collection(
             name="ntu_facilities",
-            metadata={"description": "NTU Facilities with semantic search capabilities"}
+            metadata={
+                "description": "NTU Facilities with semantic search capabilities",
+                # Keep l2: the relevance thresholds are calibrated on squared-L2 distances
+                "hnsw:space": "l2",
+                "hnsw:M": 24,
+                "hnsw:construction_ef": 128,
+                "hnsw:search_ef": 100,
+                # Fewer index flushes during bulk reloads
+                "hnsw:batch_size": 1000,
+                "hnsw:sync_threshold": 10000
+            },
+            embedding_function=_SentenceTransformerEmbeddingFunction(self.embedding_model)
         )
-        
-        print(f"Vector DB initialized. Collection size: {self.collection.count()}")
     
     def create_facility_document(self, facility: Dict[str, Any]) -> str:
         """Create a rich text document for each facility for better semantic search"""
@@ -40,30 +241,8 @@ class FacilityVectorDB:
         unit = facility.get('unit_number', '')
         
         # Extract attributes and create readable descriptions
-        attrs = facility.get('attrs', {})
-        
-        # Create attribute descriptions
-        attribute_descriptions = []
-        if attrs.get('aircon'):
-            attribute_descriptions.append("air conditioning available")
-        if attrs.get('quiet_zone'):
-            attribute_descriptions.append("quiet study environment")
-        if attrs.get('outlet'):
-            attribute_descriptions.append("power outlets for charging devices")
-        if attrs.get('monitor'):
-            attribute_descriptions.append("computer monitors and screens")
-        if attrs.get('whiteboard'):
-            attribute_descriptions.append("whiteboard for presentations")
-        if attrs.get('projector'):
-            attribute_descriptions.append("projector for presentations")
-        if attrs.get('halal'):
-            attribute_descriptions.append("halal food options")
-        if attrs.get('vegetarian'):
-            attribute_descriptions.append("vegetarian food options")
-        if attrs.get('dine_in'):
-            attribute_descriptions.append("dine-in seating available")
-        if attrs.get('takeaway'):
-            attribute_descriptions.append("takeaway options")
+        attrs = facility.get('attrs') or {}
+        attribute_descriptions = [description for key, description in _ATTR_DESCRIPTIONS if attrs.get(key)]
         
         # Create opening hours description
         open_days = facility.get('open_days', [])
@@ -94,96 +273,245 @@ class FacilityVectorDB:
             document_parts.append(schedule_desc)
         
         # Add contextual descriptions based on type
-        if facility_type == 'study_area':
-            document_parts.append("Perfect for studying, reading, research, homework, and academic work")
-        elif facility_type == 'discussion_area':
-            document_parts.append("Ideal for group discussions, meetings, team work, and presentations")
-        elif facility_type == 'food':
-            document_parts.append("Food and dining options, restaurant, meals, eating")
-        elif facility_type == 'beverage':
-            document_parts.append("Drinks, coffee, tea, beverages, refreshments")
+        type_context = _TYPE_CONTEXT.get(facility_type)
+        if type_context:
+            document_parts.append(type_context)
         
         return ". ".join(document_parts)
     
-    def add_facilities(self, facilities: List[Dict[str, Any]]):
-        """Add facilities to vector database"""
-        print(f"Adding {len(facilities)} facilities to vector database...")
-        
-        # Prepare documents and metadata
+    def _facility_metadata(self, facility: Dict[str, Any], document: str) -> Dict[str, Any]:
+        """Store complete facility data as metadata (handle None values)"""
+        return {
+            # Short hash of the embedded text, so unchanged documents can be detected without fetching them
+            'doc_hash': self.document_hash(document),
+            'id': str(facility.get('id') or ''),
+            'name': str(facility.get('name') or ''),
+            'type': str(facility.get('type') or ''),
+            'building': str(facility.get('building') or ''),
+            'floor': str(facility.get('floor') or ''),
+            'unit_number': str(facility.get('unit_number') or ''),
+            'open_time': str(facility.get('open_time') or ''),
+            'close_time': str(facility.get('close_time') or ''),
+            # open_days and attrs share one JSON payload, decoded once per hit
+            'payload': orjson.dumps({'open_days': facility.get('open_days') or [], 'attrs': facility.get('attrs') or {}}).decode(),
+            'days_mask': encode_days_mask(facility.get('open_days')),
+            'attrs_mask': encode_attrs_mask(facility.get('attrs')),
+            'features': str(facility.get('features_str') or ''),
+            'code': str(facility.get('code') or ''),
+            'map_url': str(facility.get('map_url') or '')
+        }
+
+    @staticmethod
+    def _metadata_matches(stored: Optional[Dict[str, Any]], metadata: Dict[str, Any]) -> bool:
+        """Whether stored metadata already holds every current-schema field of metadata"""
+        # Chroma merges metadata on upsert, so rows written before the payload field keep their old
+        # open_days/attrs keys; comparing whole dicts would rewrite those rows on every sync
+        return stored is not None and all(stored.get(key) == value for key, value in metadata.items())
+
+    def document_hash(self, document: str) -> str:
+        """Short hash of a document and the model that embeds it; a mismatch means the stored vector is stale"""
+        return hashlib.blake2b(f"{self.embedding_version}\n{document}".encode(), digest_size=8).hexdigest()
+
+    def _prepare_records(self, facilities: List[Dict[str, Any]]):
+        """Build the ids, semantic documents and metadata stored for each facility"""
         documents = []
         metadatas = []
         ids = []
         
         for facility in facilities:
-            # Create semantic document
             document = self.create_facility_document(facility)
             documents.append(document)
-            
-            # Store complete facility data as metadata (handle None values)
-            metadata = {
-                'id': str(facility.get('id') or ''),
-                'name': str(facility.get('name') or ''),
-                'type': str(facility.get('type') or ''),
-                'building': str(facility.get('building') or ''),
-                'floor': str(facility.get('floor') or ''),
-                'unit_number': str(facility.get('unit_number') or ''),
-                'open_time': str(facility.get('open_time') or ''),
-                'close_time': str(facility.get('close_time') or ''),
-                'open_days': json.dumps(facility.get('open_days') or []),
-                'attrs': json.dumps(facility.get('attrs') or {}),
-                'code': str(facility.get('code') or ''),
-                'map_url': str(facility.get('map_url') or '')
-            }
-            metadatas.append(metadata)
+            metadatas.append(self._facility_metadata(facility, document))
             ids.append(f"facility_{facility.get('id', len(ids))}")
         
-        # Add to ChromaDB & convert data into vectors
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        return ids, documents, metadatas
+
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed facility documents, encoding only those missing from the persistent cache"""
+        fingerprints = [self.embedding_cache.fingerprint(document) for document in documents]
+        cached = self.embedding_cache.get_many(list(set(fingerprints)))
+        
+        missing = {fp: document for fp, document in zip(fingerprints, documents) if fp not in cached}
+        if missing:
+            fresh = dict(zip(missing.keys(), self._encode_parallel(list(missing.values()))))
+            self.embedding_cache.put_many(fresh)
+            cached.update(fresh)
+        
+        print(f"Embeddings: {len(documents) - len(missing)} cached, {len(missing)} encoded")
+        return [cached[fp].tolist() for fp in fingerprints]
+    
+    def _encode_parallel(self, documents: List[str], chunk_size: int = 64) -> List[np.ndarray]:
+        """Encode documents in chunks across a thread pool (torch releases the GIL during inference)"""
+        def encode(chunk: List[str]) -> np.ndarray:
+            return self.embedding_model.encode(
+                chunk, batch_size=chunk_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+            )
+        
+        chunks = [documents[start:start + chunk_size] for start in range(0, len(documents), chunk_size)]
+        if len(chunks) == 1:
+            return list(encode(chunks[0]))
+        
+        workers = min(len(chunks), int(os.getenv('EMBEDDING_WORKERS', '4')))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as executor:
+            # map() yields chunks in submission order, keeping embeddings aligned with documents
+            return [embedding for chunk in executor.map(encode, chunks) for embedding in chunk]
+    
+    @staticmethod
+    def _write_in_batches(write, ids: List[str], documents: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, str]], batch_size: int = 5000):
+        """Call collection.add/upsert in slices that stay under Chroma's per-call batch limit"""
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            write(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end]
+            )
+    
+    def add_facilities(self, facilities: List[Dict[str, Any]]):
+        """Add facilities to vector database"""
+        print(f"Adding {len(facilities)} facilities to vector database...")
+        
+        ids, documents, metadatas = self._prepare_records(facilities)
+        
+        # Add to ChromaDB with precomputed (cached) vectors
+        self._write_in_batches(self.collection.add, ids, documents, self.embed_documents(documents), metadatas)
+        self.version += 1
         
         print(f"Added {len(facilities)} facilities. Total in DB: {self.collection.count()}")
+
+    def sync_facilities(self, facilities: List[Dict[str, Any]]):
+        """Make the collection match facilities: upsert new or changed ones, delete the rest"""
+        print(f"Syncing {len(facilities)} facilities to vector database...")
+        
+        ids, documents, metadatas = self._prepare_records(facilities)
+        
+        # Metadata carries the document hash, so it alone tells whether a row changed
+        existing = self.collection.get(include=['metadatas'])
+        current = dict(zip(existing['ids'], existing['metadatas']))
+        
+        # Unchanged rows are left untouched
+        changed = [i for i, doc_id in enumerate(ids) if not self._metadata_matches(current.get(doc_id), metadatas[i])]
+        stale = list(current.keys() - set(ids))
+        
+        if stale or changed:
+            self.version += 1
+        if stale:
+            self.collection.delete(ids=stale)
+        if changed:
+            changed_documents = [documents[i] for i in changed]
+            self._write_in_batches(
+                self.collection.upsert,
+                [ids[i] for i in changed],
+                changed_documents,
+                self.embed_documents(changed_documents),
+                [metadatas[i] for i in changed]
+            )
+        
+        print(f"Synced facilities: {len(changed)} upserted, {len(stale)} deleted, "
+              f"{len(ids) - len(changed)} unchanged. Total in DB: {self.collection.count()}")
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode queries into unit-normalized embeddings in a single forward pass"""
+        return self.embedding_model.encode(queries, convert_to_numpy=True, normalize_embeddings=True)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Encode a query into a unit-normalized embedding"""
+        return self.embed_queries([query])[0]
+
+    def semantic_search(self, query: str, n_results: int = 10, query_embedding: Optional[np.ndarray] = None,
+                        where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Perform semantic search on facilities (reuses query_embedding when the caller already has one)"""
+        query_embeddings = None if query_embedding is None else query_embedding[np.newaxis, :]
+        return self.semantic_search_batch([query], n_results=n_results, query_embeddings=query_embeddings, where=where)[0]
+
+    def _filterable_metadatas(self) -> List[Dict[str, Any]]:
+        """Metadata of every row, re-read only after the collection changes"""
+        snapshot = self._filter_metadata
+        if snapshot is None or snapshot[0] != self.version:
+            snapshot = (self.version, self.collection.get(include=['metadatas'])['metadatas'])
+            self._filter_metadata = snapshot
+        return snapshot[1]
     
-    def semantic_search(self, query: str, n_results: int = 10) -> List[Dict[str, Any]]:
-        """Perform semantic search on facilities"""
-        print(f"Performing semantic search for: '{query}'")
+    def semantic_search_batch(self, queries: List[str], n_results: int = 10, query_embeddings: Optional[np.ndarray] = None,
+                              where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Perform semantic search for several queries with one vector database call, optionally within a build_facility_where filter"""
+        print(f"Performing semantic search for {len(queries)} queries: {queries}")
+        
+        if where:
+            metadatas = self._filterable_metadatas()
+            fields = _where_fields(where)
+            if not all(fields <= metadata.keys() for metadata in metadatas):
+                # Rows written before the mask fields existed can never match a filter on them, so search
+                # unfiltered (callers re-check open days) until the next sync_facilities rewrites those rows
+                print(f"Collection predates filter fields {sorted(fields)}; searching unfiltered")
+                where = None
+            else:
+                # Chroma cannot return more neighbours than facilities pass the filter; count them
+                # from the cached snapshot rather than a filtered scan per search
+                n_results = min(n_results, sum(matches_where(metadata, where) for metadata in metadatas))
+                if not n_results:
+                    return [[] for _ in queries]
         
         # Query the vector database
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            include=['documents', 'metadatas', 'distances']
-        )
+        if query_embeddings is not None:
+            results = self.collection.query(
+                query_embeddings=query_embeddings.tolist(),
+                n_results=n_results,
+                where=where,
+                include=['documents', 'metadatas', 'distances']
+            )
+        else:
+            results = self.collection.query(
+                query_texts=queries,
+                n_results=n_results,
+                where=where,
+                include=['documents', 'metadatas', 'distances']
+            )
+        
+        # Process results (one list of facilities per query)
+        batch = []
+        for q in range(len(queries)):
+            facilities = []
+            if results['metadatas'] and results['metadatas'][q]:
+                for i, metadata in enumerate(results['metadatas'][q]):
+                    facilities.append(self._facility_from_metadata(metadata, results['documents'][q][i], results['distances'][q][i]))
+            batch.append(facilities)
         
-        # Process results
-        facilities = []
-        if results['metadatas'] and results['metadatas'][0]:
-            for i, metadata in enumerate(results['metadatas'][0]):
-                distance = results['distances'][0][i]
-                
-                # Reconstruct facility object
-                facility = {
-                    'id': int(metadata['id']),
-                    'name': metadata['name'],
-                    'type': metadata['type'].replace('_', ' '),  # Replace underscores with spaces
-                    'building': metadata['building'],
-                    'floor': metadata['floor'],
-                    'unit_number': metadata['unit_number'],
-                    'open_time': metadata['open_time'],
-                    'close_time': metadata['close_time'],
-                    'open_days': json.loads(metadata['open_days']),
-                    'attrs': json.loads(metadata['attrs']),
-                    'code': metadata['code'],
-                    'map_url': metadata['map_url'],
-                    'distance': distance,  # Use distance directly
-                    'matched_text': results['documents'][0][i]
-                }
-                facilities.append(facility)
-        
-        print(f"Found {len(facilities)} semantic matches")
-        return facilities
+        print(f"Found {sum(len(facilities) for facilities in batch)} semantic matches")
+        return batch
+    
+    @staticmethod
+    def _facility_from_metadata(metadata: Dict[str, Any], document: str, distance: float) -> Dict[str, Any]:
+        """Reconstruct a facility object from its stored metadata"""
+        if 'payload' in metadata:
+            payload = _decode_metadata_json(metadata['payload'])
+            open_days, attrs = payload['open_days'], payload['attrs']
+        else:
+            # Collections written before open_days/attrs were fused into one payload
+            open_days = _decode_metadata_json(metadata['open_days'])
+            attrs = _decode_metadata_json(metadata['attrs'])
+        
+        return {
+            'id': int(metadata['id']),
+            'name': metadata['name'],
+            'type': metadata['type'].replace('_', ' '),  # Replace underscores with spaces
+            'building': metadata['building'],
+            'floor': metadata['floor'],
+            'unit_number': metadata['unit_number'],
+            'open_time': metadata['open_time'],
+            'close_time': metadata['close_time'],
+            'open_days': open_days,
+            'attrs': attrs,
+            # Collections written before the masks existed get them computed on read
+            'days_mask': metadata.get('days_mask', encode_days_mask(open_days)),
+            'attrs_mask': metadata.get('attrs_mask', encode_attrs_mask(attrs)),
+            'features_str': metadata.get('features', ''),
+            'code': metadata['code'],
+            'map_url': metadata['map_url'],
+            'distance': distance,  # Use distance directly
+            'matched_text': document
+        }
     
     def update_facility(self, facility: Dict[str, Any]):
         """Update a single facility in the vector database"""
@@ -191,35 +519,33 @@ class FacilityVectorDB:
         
         # Create new document
         document = self.create_facility_document(facility)
+        metadata = self._facility_metadata(facility, document)
         
-        # Create metadata
-        metadata = {
-            'id': str(facility.get('id', '')),
-            'name': facility.get('name', ''),
-            'type': facility.get('type', ''),
-            'building': facility.get('building', ''),
-            'floor': str(facility.get('floor', '')),
-            'unit_number': facility.get('unit_number', ''),
-            'open_time': str(facility.get('open_time', '')),
-            'close_time': str(facility.get('close_time', '')),
-            'open_days': json.dumps(facility.get('open_days', [])),
-            'attrs': json.dumps(facility.get('attrs', {})),
-            'code': facility.get('code', ''),
-            'map_url': facility.get('map_url', '')
-        }
+        existing = self.collection.get(ids=[facility_id], include=['metadatas'])
+        current = existing['metadatas'][0] if existing['metadatas'] else None
         
-        # Update in ChromaDB
-        self.collection.update(
-            ids=[facility_id],
-            documents=[document],
-            metadatas=[metadata]
-        )
+        if self._metadata_matches(current, metadata):
+            print(f"Facility unchanged, skipped update: {facility.get('name')}")
+            return
+        
+        # Update in ChromaDB; only re-embed when the document text changed
+        self.version += 1
+        if current and current.get('doc_hash') == metadata['doc_hash']:
+            self.collection.update(ids=[facility_id], metadatas=[metadata])
+        else:
+            self.collection.update(
+                ids=[facility_id],
+                documents=[document],
+                embeddings=self.embed_documents([document]),
+                metadatas=[metadata]
+            )
         
         print(f"Updated facility: {facility.get('name')}")
     
     def delete_facility(self, facility_id: int):
         """Delete a facility from vector database"""
         self.collection.delete(ids=[f"facility_{facility_id}"])
+        self.version += 1
         print(f"Deleted facility ID: {facility_id}")
     
     def get_collection_stats(self) -> Dict[str, Any]:
@@ -243,19 +569,44 @@ class FacilityVectorDB:
             print(f"Error retrieving collection stats: {e}")
             raise e
     
-    def reset_database(self):
-        """Clear all data from the vector database"""
-        self.client.delete_collection("ntu_facilities")
-        self.collection = self.client.get_or_create_collection(
-            name="ntu_facilities",
-            metadata={"description": "NTU Facilities with semantic search capabilities"}
-        )
+    def reset_database(self, facilities: Optional[List[Dict[str, Any]]] = None):
+        """
+        Clear all data from the vector database, or with facilities, make it match them in place:
+        only changed records are upserted and only removed ones deleted, so the HNSW graph is kept
+        """
+        if facilities is not None:
+            self.sync_facilities(facilities)
+            return
+        self._clear()
+        self.version += 1
         print("Vector database reset complete")
+    
+    def _clear(self):
+        # Dropping the collection is the only way to change its HNSW settings
+        self.client.delete_collection("ntu_facilities")
+        self.collection = self._get_collection()
 
 # Standalone functions for easy integration
+_db_lock = threading.Lock()
+_db_instance: Optional[FacilityVectorDB] = None
+
 def initialize_vector_db() -> FacilityVectorDB:
-    """Initialize and return vector database instance"""
-    return FacilityVectorDB()
+    """Return the process-wide vector database selected by VECTOR_BACKEND (chroma, pgvector or usearch), creating it once"""
+    global _db_instance
+    if _db_instance is None:
+        with _db_lock:
+            # Re-check under the lock so concurrent first callers load the embedding model only once
+            if _db_instance is None:
+                backend = os.getenv('VECTOR_BACKEND', 'chroma')
+                if backend == 'pgvector':
+                    from .pgvector_store import PgVectorFacilityDB
+                    _db_instance = PgVectorFacilityDB()
+                elif backend == 'usearch':
+                    from .usearch_store import UsearchFacilityDB
+                    _db_instance = UsearchFacilityDB()
+                else:
+                    _db_instance = FacilityVectorDB()
+    return _db_instance
 
 def load_facilities_to_vector_db(vector_db: FacilityVectorDB, facilities_data: List[Dict]):
     """Load facilities from your PostgreSQL data into vector database"""
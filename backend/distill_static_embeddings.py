@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Distill Static Embeddings
+One-off script that distills all-MiniLM-L6-v2 into a Model2Vec static model for EMBEDDING_BACKEND=model2vec
+"""
+
+import sys
+
+from model2vec.distill import distill
+
+
+def main(output_path: str = "ntu_m2v"):
+    print("🧪 Distilling sentence-transformers/all-MiniLM-L6-v2 into a static embedding model...")
+    
+    # Keep all 384 dimensions so existing vector columns/collections keep their shape
+    static_model = distill(model_name="sentence-transformers/all-MiniLM-L6-v2", pca_dims=None)
+    static_model.save_pretrained(output_path)
+    
+    print(f"✅ Saved static model to {output_path}")
+    print("Set EMBEDDING_BACKEND=model2vec (and EMBEDDING_MODEL2VEC_PATH if not ./ntu_m2v), then reload facilities")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
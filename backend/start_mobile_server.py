@@ -37,13 +37,16 @@ def start_server():
     print("🔥 Starting server... Press Ctrl+C to stop")
     print()
     
+    # Auto-reload is for development only; each reload re-imports the app and reloads the embedding model
+    reload = os.getenv("APP_ENV", "development") != "production"
+    
     # Start server on all interfaces
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",  # Listen on all interfaces
         port=8000,
-        reload=True,
-        reload_dirs=["app"],
+        reload=reload,
+        reload_dirs=["app"] if reload else None,
         log_level="info"
     )
 
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Server-side tests for the /chat/batch endpoint
+Retrieval and GPT-4 are stubbed, so no model, vector database or OpenAI key is needed
+Run from the backend directory: python -m pytest test_chat_batch.py
+"""
+
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app.openai_semantic_chat_service as chat_service_module
+from app.openai_semantic_chat_service import OpenAISemanticChatService
+
+
+class StubChatService(OpenAISemanticChatService):
+    """Real batching logic with retrieval and completion replaced by recorders"""
+
+    def __init__(self):
+        self.chat_model = "test-model"
+        self.over_fetch_factor = 1
+        self.retrieved = []
+        self.completed = []
+
+    async def _aretrieve_batch(self, items):
+        self.retrieved.append([item[0] for item in items])
+        return [(np.zeros(3), None, []) for _ in items]
+
+    async def _acomplete_query(self, user_query, query_day, fingerprint, retrieved, max_results, conversation_history):
+        self.completed.append(user_query)
+        return self._build_query_result(user_query, f"answer to {user_query}", query_day)
+
+
+SERVICE = StubChatService()
+# app.main creates its service at import time; hand it the stub so nothing real is loaded
+chat_service_module.get_chat_service = lambda: SERVICE
+
+from app import main  # noqa: E402
+
+client = TestClient(main.app)
+
+
+def setup_function():
+    SERVICE.retrieved.clear()
+    SERVICE.completed.clear()
+
+
+def test_batch_results_follow_input_order():
+    response = client.post("/chat/batch", json={"messages": ["coffee", "toilet", "library on sunday"]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["response"] for r in results] == ["answer to coffee", "answer to toilet", "answer to library on sunday"]
+    assert results[2]["query_day"] == "Sunday"
+    assert SERVICE.retrieved == [["coffee", "toilet", "library on sunday"]]
+
+
+def test_duplicate_queries_are_answered_once():
+    response = client.post("/chat/batch", json={"messages": ["coffee", "toilet", "coffee", "coffee"]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["response"] for r in results] == ["answer to coffee", "answer to toilet", "answer to coffee", "answer to coffee"]
+    assert SERVICE.retrieved == [["coffee", "toilet"]]
+    assert sorted(SERVICE.completed) == ["coffee", "toilet"]
+
+
+def test_fanned_out_results_are_independent_copies():
+    results = asyncio.run(SERVICE.aprocess_queries(["coffee", "coffee"]))
+    results[0]["response"] = "changed"
+    assert results[1]["response"] == "answer to coffee"
+
+
+def test_batch_rejects_malformed_body():
+    response = client.post("/chat/batch", json={"message": "coffee"})
+    assert response.status_code == 422
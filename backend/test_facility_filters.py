@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for facility metadata bitmasks and build_facility_where filters
+Run from the backend directory: python -m pytest test_facility_filters.py
+"""
+
+import pytest
+
+from app.vector_db_service import (
+    DAY_BITS, build_facility_where, encode_days_mask, format_features, matches_where
+)
+
+
+def test_encode_days_mask_ignores_duplicates_and_unknown_days():
+    assert encode_days_mask(['Monday', 'Monday', 'Funday']) == DAY_BITS['Monday']
+    assert encode_days_mask(None) == 0
+
+
+def test_no_constraints_means_no_filter():
+    assert build_facility_where() is None
+
+
+def test_single_constraint_is_not_wrapped_in_and():
+    assert build_facility_where(facility_type='library') == {'type': {'$eq': 'library'}}
+
+
+def test_combined_constraints_use_and():
+    where = build_facility_where(facility_type='food', building='North Spine')
+    assert where == {'$and': [{'type': {'$eq': 'food'}}, {'building': {'$eq': 'North Spine'}}]}
+
+
+def test_open_day_filter_admits_facilities_open_that_day_or_without_days():
+    where = build_facility_where(open_days_mask=DAY_BITS['Sunday'])
+
+    assert matches_where({'days_mask': encode_days_mask(['Saturday', 'Sunday'])}, where)
+    # Facilities without open days are assumed to be open every day
+    assert matches_where({'days_mask': 0}, where)
+    assert not matches_where({'days_mask': encode_days_mask(['Monday'])}, where)
+
+
+def test_open_day_filter_for_weekend_matches_either_day():
+    weekend = DAY_BITS['Saturday'] | DAY_BITS['Sunday']
+    where = build_facility_where(open_days_mask=weekend)
+
+    assert matches_where({'days_mask': DAY_BITS['Saturday']}, where)
+    assert not matches_where({'days_mask': DAY_BITS['Friday']}, where)
+
+
+def test_open_day_filter_lists_every_matching_mask():
+    where = build_facility_where(open_days_mask=DAY_BITS['Monday'])
+    masks = where['days_mask']['$in']
+    # Every mask with the Monday bit, plus the no-days mask
+    assert len(masks) == 2 ** (len(DAY_BITS) - 1) + 1
+    assert all(mask == 0 or mask & DAY_BITS['Monday'] for mask in masks)
+
+
+def test_rows_without_the_filtered_field_do_not_match():
+    where = build_facility_where(open_days_mask=DAY_BITS['Monday'])
+    assert not matches_where({'name': 'legacy row'}, where)
+
+
+def test_matches_where_rejects_unknown_operators():
+    with pytest.raises(ValueError):
+        matches_where({'type': 'food'}, {'type': {'$ne': 'food'}})
+
+
+def test_format_features_lists_only_set_boolean_flags():
+    attrs = {'quiet_zone': True, 'aircon': False, 'capacity': 40, 'cuisine': 'thai'}
+    assert format_features(attrs) == 'quiet zone'
+    assert format_features(None) == ''
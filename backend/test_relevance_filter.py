@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for relevance filtering of semantic search results
+Run from the backend directory: python -m pytest test_relevance_filter.py
+"""
+
+import numpy as np
+
+from app.openai_semantic_chat_service import (
+    OpenAISemanticChatService, _BEVERAGE_RE, _FOOD_QUERY_RE, _FOOD_RE, _STUDY_QUERY_RE, _rank_food_candidates
+)
+
+
+def make_service() -> OpenAISemanticChatService:
+    # The filters only use pure helper methods, so skip the model and client setup in __init__
+    return OpenAISemanticChatService.__new__(OpenAISemanticChatService)
+
+
+def facility(name: str, facility_type: str, distance: float, building: str = "") -> dict:
+    return {'name': name, 'type': facility_type, 'distance': distance, 'building': building}
+
+
+def test_rank_food_candidates_boosts_spine_and_healthy():
+    distance = np.array([1.0, 1.1, 1.15])
+    spine = np.array([0, 1, 0], dtype=np.int8)
+    healthy = np.array([0, 0, 1], dtype=np.int8)
+
+    assert _rank_food_candidates(distance, spine, healthy, is_healthy_query=False).tolist() == [1, 0, 2]
+    assert _rank_food_candidates(distance, spine, healthy, is_healthy_query=True).tolist() == [1, 2, 0]
+
+
+def test_rank_food_candidates_is_stable_on_ties():
+    distance = np.array([1.0, 1.0, 1.0])
+    zeros = np.zeros(3, dtype=np.int8)
+    assert _rank_food_candidates(distance, zeros, zeros, is_healthy_query=False).tolist() == [0, 1, 2]
+
+
+def test_food_ranking_survives_final_sort():
+    results = [
+        facility("Koufu", "food", 1.1, building="North Spine"),
+        facility("Fine Food", "food", 1.0),
+    ]
+    relevant = make_service()._filter_relevant_results(results, "where can I eat lunch")
+    # The spine boost puts Koufu first even though Fine Food is closer
+    assert [r['name'] for r in relevant] == ["Koufu", "Fine Food"]
+
+
+def test_food_result_stays_ahead_of_closer_beverage_fallback():
+    results = [
+        facility("Starbucks", "beverage", 0.9),
+        facility("Koufu", "food", 1.0, building="North Spine"),
+    ]
+    relevant = make_service()._filter_relevant_results(results, "I'm hungry, where can I eat?")
+    assert [r['name'] for r in relevant] == ["Koufu", "Starbucks"]
+
+
+def test_other_queries_sort_by_distance():
+    results = [facility("B", "toilet", 1.2), facility("A", "toilet", 0.8), facility("Far", "toilet", 1.9)]
+    relevant = make_service()._filter_relevant_results(results, "where is the nearest toilet")
+    assert [r['name'] for r in relevant] == ["A", "B"]
+
+
+def test_day_filter_drops_facilities_closed_on_query_day():
+    results = [
+        dict(facility("Weekday Lib", "library", 0.9), open_days=['Monday'], days_mask=1),
+        facility("Always Open", "library", 1.0),
+    ]
+    relevant = make_service()._filter_relevant_results(results, "study spot", query_day='Saturday')
+    assert [r['name'] for r in relevant] == ["Always Open"]
+
+
+def test_query_intent_matches_word_prefixes():
+    for query in ("somewhere quiet to study", "studying late", "I need to work", "quietly revise", "homework help"):
+        assert _STUDY_QUERY_RE.search(query), query
+    for query in ("where to eat", "Lunchtime options", "meals nearby", "I'm hungry"):
+        assert _FOOD_QUERY_RE.search(query), query
+
+    # Keywords inside other words are not intents
+    assert not _STUDY_QUERY_RE.search("fix my network")
+    assert not _FOOD_QUERY_RE.search("dine-in seating")
+
+
+def test_facility_names_match_whole_words():
+    assert _BEVERAGE_RE.search("Gong Cha")
+    assert _BEVERAGE_RE.search("Teas & More")
+    assert not _BEVERAGE_RE.search("Team Room")
+    assert _FOOD_RE.search("Noodles Express")
+    assert not _FOOD_RE.search("Reunion Hall")
+
+
+def test_extract_day_from_query():
+    service = make_service()
+    assert service._extract_day_from_query("open on Saturdays?") == "Saturday"
+    assert service._extract_day_from_query("fri night food") == "Friday"
+    assert service._extract_day_from_query("study on weekdays") == "Weekday"
+    # Day aliases inside other words are not days
+    for query in ("meet a friend", "wedding venue", "sunny spot outside", "satay stall"):
+        assert service._extract_day_from_query(query) is None, query
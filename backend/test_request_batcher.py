@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the request batcher that coalesces concurrent retrievals
+Run from the backend directory: python -m pytest test_request_batcher.py
+"""
+
+import asyncio
+
+from app.request_batcher import RequestBatcher
+
+
+def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    async def run():
+        batcher = RequestBatcher(batch_fn, max_batch_size=8, max_wait=0.05)
+        return await asyncio.gather(*[batcher.submit(item) for item in ("a", "b", "c")])
+
+    assert asyncio.run(run()) == ["A", "B", "C"]
+    assert calls == [["a", "b", "c"]]
+
+
+def test_full_batch_flushes_before_the_window_closes():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(list(items))
+        return items
+
+    async def run():
+        batcher = RequestBatcher(batch_fn, max_batch_size=2, max_wait=10)
+        return await asyncio.wait_for(asyncio.gather(*[batcher.submit(i) for i in range(4)]), timeout=1)
+
+    assert asyncio.run(run()) == [0, 1, 2, 3]
+    assert calls == [[0, 1], [2, 3]]
+
+
+def test_bad_item_fails_only_its_own_caller():
+    async def batch_fn(items):
+        if "bad" in items:
+            raise ValueError("bad query")
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = RequestBatcher(batch_fn, max_batch_size=8, max_wait=0.05)
+        return await asyncio.gather(batcher.submit("bad"), batcher.submit("x"), return_exceptions=True)
+
+    bad, good = asyncio.run(run())
+    assert isinstance(bad, ValueError)
+    assert good == "xx"
+
+
+def test_running_tasks_are_referenced_and_released():
+    async def run():
+        released = asyncio.Event()
+
+        async def batch_fn(items):
+            await released.wait()
+            return items
+
+        batcher = RequestBatcher(batch_fn, max_batch_size=1, max_wait=0)
+        pending = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.01)
+        # The collector and the in-flight dispatch are both held
+        in_flight = len(batcher._tasks)
+        released.set()
+        result = await pending
+        await asyncio.sleep(0)
+        return in_flight, result, len(batcher._tasks)
+
+    in_flight, result, remaining = asyncio.run(run())
+    assert in_flight == 2
+    assert result == "a"
+    # Only the long-running collector is still held
+    assert remaining == 1
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the exact-match and semantic response caches
+Run from the backend directory: python -m pytest test_response_cache.py
+"""
+
+import time
+
+import numpy as np
+
+from app.response_cache import ResponseCache, SemanticResponseCache
+
+
+def unit(*values: float) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_make_key_ignores_argument_order():
+    assert ResponseCache.make_key(model="m", user="hi") == ResponseCache.make_key(user="hi", model="m")
+    assert ResponseCache.make_key(model="m", user="hi") != ResponseCache.make_key(model="m", user="hello")
+
+
+def test_response_cache_counts_hits_and_misses():
+    cache = ResponseCache(maxsize=10, ttl=60, name='test_exact')
+    assert cache.get("k") is None
+    cache.set("k", "answer")
+    assert cache.get("k") == "answer"
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2, ttl=60, name='test_lru')
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()['evictions'] == 1
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache(maxsize=10, ttl=0.05, name='test_ttl')
+    cache.set("k", "answer")
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_semantic_cache_matches_similar_queries_with_the_same_fingerprint():
+    cache = SemanticResponseCache(threshold=0.95, maxsize=4, ttl=60, name='test_semantic')
+    cache.store(unit(1, 0, 0), "fp", "coffee answer")
+
+    assert cache.lookup(unit(1, 0.05, 0), "fp") == "coffee answer"
+    # Too far from the stored query, or a different prompt setup
+    assert cache.lookup(unit(1, 1, 0), "fp") is None
+    assert cache.lookup(unit(1, 0, 0), "other") is None
+
+
+def test_semantic_cache_returns_the_most_similar_entry():
+    cache = SemanticResponseCache(threshold=0.9, maxsize=4, ttl=60, name='test_semantic_best')
+    cache.store(unit(1, 0.3, 0), "fp", "near")
+    cache.store(unit(1, 0.01, 0), "fp", "nearest")
+    assert cache.lookup(unit(1, 0, 0), "fp") == "nearest"
+
+
+def test_semantic_cache_evicts_oldest_and_reuses_its_slot():
+    cache = SemanticResponseCache(threshold=0.99, maxsize=2, ttl=60, name='test_semantic_lru')
+    cache.store(unit(1, 0, 0), "fp", "a")
+    cache.store(unit(0, 1, 0), "fp", "b")
+    cache.store(unit(0, 0, 1), "fp", "c")
+
+    assert cache.lookup(unit(1, 0, 0), "fp") is None
+    assert cache.lookup(unit(0, 0, 1), "fp") == "c"
+    assert cache.stats()['evictions'] == 1
+    assert cache._next_slot == 2
+
+
+def test_semantic_cache_expires_entries():
+    cache = SemanticResponseCache(threshold=0.9, maxsize=2, ttl=0.05, name='test_semantic_ttl')
+    cache.store(unit(1, 0, 0), "fp", "a")
+    time.sleep(0.1)
+    assert cache.lookup(unit(1, 0, 0), "fp") is None
+    assert cache.stats()['size'] == 0
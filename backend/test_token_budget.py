@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for token counting, the TPM/RPM token bucket and the conversation buffer
+Run from the backend directory: python -m pytest test_token_budget.py
+"""
+
+import asyncio
+
+import pytest
+
+from app import token_budget
+from app.conversation_buffer import ConversationBuffer
+from app.token_budget import TokenBucketRateLimiter, count_tokens, truncate_to_tokens
+
+
+@pytest.fixture
+def offline_tokenizer(monkeypatch):
+    """Make every tokenizer load fail, as when tiktoken cannot download its encoding"""
+    def unavailable(*args):
+        raise OSError("network unreachable")
+
+    token_budget._encoding_for.cache_clear()
+    monkeypatch.setattr(token_budget.tiktoken, "encoding_for_model", unavailable)
+    monkeypatch.setattr(token_budget.tiktoken, "get_encoding", unavailable)
+    yield
+    token_budget._encoding_for.cache_clear()
+
+
+def test_count_tokens_estimates_without_a_tokenizer(offline_tokenizer):
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+    assert truncate_to_tokens("x" * 100, 5) == "x" * 20
+
+
+def test_rate_limiter_spends_budget_without_waiting():
+    async def run():
+        limiter = TokenBucketRateLimiter(tpm_limit=1000, rpm_limit=10)
+        await limiter.acquire(400)
+        await limiter.acquire(400)
+        return limiter._tokens, limiter._requests
+
+    tokens, requests = asyncio.run(run())
+    assert tokens == pytest.approx(200, abs=1)
+    assert requests == pytest.approx(8, abs=0.01)
+
+
+def test_rate_limiter_waits_for_refill():
+    async def run():
+        # 60000 tokens per minute refills 1000 tokens a second
+        limiter = TokenBucketRateLimiter(tpm_limit=60000, rpm_limit=1000)
+        await limiter.acquire(60000)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire(100)
+        return loop.time() - start
+
+    assert 0.05 <= asyncio.run(run()) < 1
+
+
+def test_rate_limiter_caps_oversized_requests_at_the_limit():
+    async def run():
+        limiter = TokenBucketRateLimiter(tpm_limit=100, rpm_limit=10)
+        await asyncio.wait_for(limiter.acquire(10_000), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_conversation_buffer_keeps_recent_turns_within_message_limit(offline_tokenizer):
+    messages = [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"turn {i}"} for i in range(6)]
+    buffer = ConversationBuffer.from_messages(messages, max_messages=3, max_tokens=1000)
+
+    assert len(buffer) == 3
+    assert buffer.render() == "Assistant: turn 3\nHuman: turn 4\nAssistant: turn 5"
+
+
+def test_conversation_buffer_evicts_oldest_turns_over_token_budget(offline_tokenizer):
+    buffer = ConversationBuffer(max_messages=10, max_tokens=10)
+    buffer.append('user', "a" * 20)
+    buffer.append('assistant', "b" * 20)
+
+    assert len(buffer) == 1
+    assert buffer.render().startswith("Assistant: ")
+    assert buffer.tokens <= 10
+
+
+def test_conversation_buffer_truncates_a_single_oversized_turn(offline_tokenizer):
+    buffer = ConversationBuffer(max_messages=4, max_tokens=10)
+    buffer.append('user', "x" * 1000)
+
+    assert len(buffer) == 1
+    assert buffer.tokens <= 10
+    assert len(buffer.render()) == 40
@@ -24,36 +24,43 @@ def view_chromadb_contents():
         # Get collection info
         collection = vector_db.collection
         
-        # Get all documents
-        results = collection.get()
-        
         print(f"📊 Collection: {collection.name}")
-        print(f"📈 Total Documents: {len(results['ids'])}")
+        print(f"📈 Total Documents: {collection.count()}")
         print("=" * 60)
         
-        # Display each document
-        for i, doc_id in enumerate(results['ids'], 1):
-            metadata = results['metadatas'][i-1] if results['metadatas'] else {}
-            document = results['documents'][i-1] if results['documents'] else ""
-            
-            print(f"\n📄 Document {i} (ID: {doc_id})")
-            print("-" * 40)
+        # Page through the collection so memory stays bounded; embeddings are never fetched
+        page_size = 1000
+        offset = 0
+        shown = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["metadatas", "documents"])
+            if not page['ids']:
+                break
             
-            # Print metadata (facility info)
-            if metadata:
-                print("🏷️  Metadata:")
-                for key, value in metadata.items():
-                    if value is not None:
-                        print(f"   {key}: {value}")
+            # Build each page's output and write it in one call instead of a print per line
+            lines = []
+            for doc_id, metadata, document in zip(page['ids'], page['metadatas'] or [], page['documents'] or []):
+                shown += 1
+                lines.append(f"\n📄 Document {shown} (ID: {doc_id})")
+                lines.append("-" * 40)
+                
+                # Metadata (facility info)
+                if metadata:
+                    lines.append("🏷️  Metadata:")
+                    lines.extend(f"   {key}: {value}" for key, value in metadata.items() if value is not None)
+                
+                # Document text (searchable content)
+                if document:
+                    lines.append("📝 Searchable Text:")
+                    lines.append(f"   {document[:200]}{'...' if len(document) > 200 else ''}")
+                
+                lines.append("-" * 40)
             
-            # Print document text (searchable content)
-            if document:
-                print(f"📝 Searchable Text:")
-                print(f"   {document[:200]}{'...' if len(document) > 200 else ''}")
+            sys.stdout.write("\n".join(lines) + "\n")
             
-            print("-" * 40)
+            offset += page_size
         
-        print(f"\n✅ Successfully displayed {len(results['ids'])} documents from ChromaDB")
+        print(f"\n✅ Successfully displayed {shown} documents from ChromaDB")
         
     except Exception as e:
         print(f"❌ Error accessing ChromaDB: {e}")